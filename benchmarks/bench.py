@@ -0,0 +1,336 @@
+"""Бенчмарки горячих путей Лабиринта сокровищ.
+
+Запуск и сравнение двух прогонов:
+
+    python benchmarks/bench.py run --out before.json
+    python benchmarks/bench.py run --out after.json
+    python benchmarks/bench.py compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from labyrinth_game.commands import parse_command  # noqa: E402
+from labyrinth_game.constants import ROOMS  # noqa: E402
+from labyrinth_game.inventory import Inventory  # noqa: E402
+from labyrinth_game.main import process_command_steps  # noqa: E402
+from labyrinth_game.output import NullSink, use_sink  # noqa: E402
+from labyrinth_game.rng import CounterRandom, pseudo_random  # noqa: E402
+from labyrinth_game.utils import invalidate_room_view  # noqa: E402
+from labyrinth_game.world import (  # noqa: E402
+    create_game_state,
+    get_mutable_room,
+    get_room,
+)
+from labyrinth_game.worldfile import LazyWorld, generate_world  # noqa: E402
+
+PERCENTILES = (50, 90, 99)
+
+
+def run_command(game_state, command, answers=()):
+    """Выполняет команду, отвечая на запросы заготовленными ответами."""
+    steps = process_command_steps(game_state, command)
+    try:
+        steps.send(None)
+        for answer in answers:
+            steps.send(answer)
+    except StopIteration:
+        return
+    steps.close()
+
+
+def summarize(samples):
+    """Считает пропускную способность и перцентили задержки в микросекундах."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    result = {
+        "iterations": len(ordered),
+        "ops_per_sec": len(ordered) / (total / 1e9) if total else None,
+        "mean_us": total / len(ordered) / 1e3,
+        "max_us": ordered[-1] / 1e3,
+    }
+    for percentile in PERCENTILES:
+        index = min(len(ordered) - 1, len(ordered) * percentile // 100)
+        result[f"p{percentile}_us"] = ordered[index] / 1e3
+    return result
+
+
+def measure(setup, action, iterations):
+    """Замеряет каждый вызов action отдельно; setup в замер не входит."""
+    samples = []
+    for _ in range(iterations):
+        argument = setup()
+        start = time.perf_counter_ns()
+        action(argument)
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples)
+
+
+def make_state(world, inventory_size):
+    """Создаёт сессию с инвентарём заданного размера (факел в конце)."""
+    game_state = create_game_state(world)
+    game_state.player_inventory = Inventory(
+        f"item_{i}" for i in range(inventory_size)
+    )
+    game_state.player_inventory.add("torch")
+    return game_state
+
+
+def first_exit(game_state):
+    """Возвращает первое направление выхода из текущей комнаты."""
+    room = get_room(game_state, game_state.current_room)
+    return next(iter(room["exits"]))
+
+
+def find_puzzle_room(world):
+    """Возвращает комнату с загадкой для замера solve или None.
+
+    В сгенерированных мирах загадка есть только у treasure_room: она
+    берётся по названию, чтобы не разбирать все комнаты файла.
+    """
+    if world is ROOMS:
+        return next(
+            (name for name, room in world.items() if room["puzzle"] is not None),
+            None,
+        )
+    room = world.get("treasure_room")
+    return "treasure_room" if room is not None and room["puzzle"] is not None else None
+
+
+def bench_commands(world, inventory_size, iterations):
+    """Замеряет основные команды на одной сессии.
+
+    look и take выполняются в начальной комнате (в ней нет загадки) с
+    исходными предметами, в какой бы комнате ни закончились замеры go.
+    """
+    game_state = make_state(world, inventory_size)
+    home = game_state.current_room
+    puzzle_room = find_puzzle_room(world)
+    solve_answers = ["?"]
+    if puzzle_room is not None and "treasure_chest" in world[puzzle_room]["items"]:
+        # Сундук сначала спрашивает, вводить ли код
+        solve_answers = ["да", "?"]
+
+    def go_home(extra_items=()):
+        game_state.current_room = home
+        room = get_mutable_room(game_state, home)
+        room["items"] = [*world[home]["items"], *extra_items]
+        invalidate_room_view(game_state, home)
+
+    def go_setup():
+        return f"go {first_exit(game_state)}"
+
+    def take_setup():
+        if "coin" in game_state.player_inventory:
+            game_state.player_inventory.remove("coin")
+        go_home(["coin"])
+        return "take coin"
+
+    def solve_setup():
+        game_state.current_room = puzzle_room
+        game_state.game_over = False
+        game_state.outcome = None
+        room = get_mutable_room(game_state, puzzle_room)
+        room["puzzle"] = world[puzzle_room]["puzzle"]
+        room["puzzle_attempts"] = 0
+        return None
+
+    def run(command):
+        run_command(game_state, command)
+
+    results = {}
+    with use_sink(NullSink()):
+        results["go"] = measure(go_setup, run, iterations)
+        go_home()
+        results["look"] = measure(lambda: "look", run, iterations)
+        results["take"] = measure(take_setup, run, iterations)
+        results["use"] = measure(lambda: "use torch", run, iterations)
+        results["inventory"] = measure(lambda: "inventory", run, iterations)
+        results["unknown"] = measure(lambda: "dance", run, iterations)
+        if puzzle_room is not None:
+            results["solve_wrong"] = measure(
+                solve_setup,
+                lambda _: run_command(game_state, "solve", solve_answers),
+                iterations,
+            )
+        else:
+            print("solve_wrong: пропущено — в мире нет комнаты с загадкой",
+                  file=sys.stderr)
+    results["parse"] = measure(lambda: "go north", parse_command, iterations)
+    results["pseudo_random"] = measure(
+        lambda: None, lambda _: pseudo_random(12345, 10), iterations,
+    )
+    counter_rng = CounterRandom(1)
+    results["counter_random"] = measure(
+        lambda: None, lambda _: counter_rng.randint(12345, 10), iterations,
+    )
+    return results
+
+
+def bench_startup(repeats=10):
+    """Замеряет время импорта labyrinth_game.main в новом процессе."""
+    def timed(code):
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples) * 1e3
+
+    interpreter = timed("pass")
+    with_import = timed("import labyrinth_game.main")
+    return {
+        "interpreter_ms": interpreter,
+        "import_main_ms": with_import,
+        "import_overhead_ms": with_import - interpreter,
+    }
+
+
+def bench_session_memory(world, sessions=1000):
+    """Оценивает память одной сессии после нескольких типичных ходов."""
+    states = []
+    with use_sink(NullSink()):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(sessions):
+            game_state = create_game_state(world)
+            run_command(game_state, "take torch")
+            run_command(game_state, f"go {first_exit(game_state)}")
+            states.append(game_state)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "sessions": sessions,
+        "bytes_per_session": (current - before) / sessions,
+        "peak_bytes_per_session": (peak - before) / sessions,
+    }
+
+
+def git_revision():
+    """Возвращает короткий хэш текущего коммита или None."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(world_sizes, inventory_sizes, iterations):
+    """Прогоняет все замеры и возвращает результаты в виде словаря."""
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "iterations": iterations,
+        },
+        "startup": bench_startup(),
+        "worlds": [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for world_size in world_sizes:
+            if world_size == 0:
+                world, label = ROOMS, "builtin"
+            else:
+                path = os.path.join(directory, f"world_{world_size}.lbw")
+                generate_world(path, world_size, seed=1)
+                world, label = LazyWorld(path), str(world_size)
+
+            entry = {
+                "world": label,
+                "memory": bench_session_memory(world),
+                "inventory": {},
+            }
+            for inventory_size in inventory_sizes:
+                entry["inventory"][str(inventory_size)] = bench_commands(
+                    world, inventory_size, iterations,
+                )
+            report["worlds"].append(entry)
+            if world is not ROOMS:
+                world.close()
+    return report
+
+
+def flatten(report):
+    """Переводит отчёт в словарь {путь метрики: значение}."""
+    metrics = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(f"{prefix}.{key}" if prefix else key, item)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[prefix] = value
+
+    walk("startup", report["startup"])
+    for entry in report["worlds"]:
+        walk(f"world={entry['world']}.memory", entry["memory"])
+        walk(f"world={entry['world']}.inventory", entry["inventory"])
+    return metrics
+
+
+def compare(old_path, new_path):
+    """Печатает изменение метрик между двумя прогонами."""
+    with open(old_path, encoding="utf-8") as file:
+        old = flatten(json.load(file))
+    with open(new_path, encoding="utf-8") as file:
+        new = flatten(json.load(file))
+
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith(("iterations", "sessions")):
+            continue
+        before, after = old[key], new[key]
+        change = (after - before) / before * 100 if before else float("nan")
+        print(f"{key:<60} {before:>14.2f} {after:>14.2f} {change:>+8.1f}%")
+
+
+def parse_sizes(text):
+    """Разбирает список размеров через запятую."""
+    return [int(value) for value in text.split(",") if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="action", required=True)
+
+    run_parser = subparsers.add_parser("run", help="выполнить замеры")
+    run_parser.add_argument("--out", default="bench.json")
+    run_parser.add_argument("--world-sizes", type=parse_sizes, default=[0, 10000],
+                            help="размеры миров через запятую (0 — ROOMS)")
+    run_parser.add_argument("--inventory-sizes", type=parse_sizes,
+                            default=[0, 100])
+    run_parser.add_argument("--iterations", type=int, default=2000)
+
+    compare_parser = subparsers.add_parser("compare", help="сравнить два прогона")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+
+    args = parser.parse_args()
+    if args.action == "compare":
+        compare(args.old, args.new)
+        return
+
+    report = run_benchmarks(args.world_sizes, args.inventory_sizes, args.iterations)
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    for key, value in flatten(report).items():
+        print(f"{key:<60} {value:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+from labyrinth_game.output import say
+from labyrinth_game.player_actions import (
+    move_player,
+    show_inventory,
+    take_item,
+    travel,
+    use_item,
+)
+from labyrinth_game.utils import (
+    attempt_open_treasure_steps,
+    describe_current_room,
+    show_help,
+    solve_puzzle_steps,
+)
+from labyrinth_game.world import finish_game, get_room
+
+UNKNOWN_COMMAND = "Неизвестная команда. Введите 'help' для списка команд."
+
+_commands = {}
+_parser = None
+_unknown = None
+_instrument = None
+
+
+class Command:
+    """Описание зарегистрированной команды.
+
+    Attributes:
+        name: Основное название команды
+        handler: Функция handler(game_state, arg); для пошаговых команд —
+            генератор (см. utils.run_prompts)
+        aliases: Дополнительные названия команды
+        missing_arg: Сообщение, если команде нужен аргумент, а его нет;
+            None для команд без аргумента
+        steps: Является ли обработчик пошаговым генератором
+    """
+
+    __slots__ = ("name", "handler", "aliases", "missing_arg", "steps")
+
+    def __init__(self, name, handler, aliases=(), missing_arg=None, steps=False):
+        self.name = name
+        self.handler = handler
+        self.aliases = tuple(aliases)
+        self.missing_arg = missing_arg
+        self.steps = steps
+
+
+def register_command(name, handler, aliases=(), missing_arg=None, steps=False):
+    """Регистрирует команду в таблице диспетчера.
+
+    Args:
+        name: Основное название команды
+        handler: Функция handler(game_state, arg), где arg — аргумент
+            в нижнем регистре или None
+        aliases: Дополнительные названия команды
+        missing_arg: Сообщение об отсутствующем аргументе; если задано,
+            обработчик вызывается только с аргументом
+        steps: Является ли обработчик пошаговым генератором
+
+    Returns:
+        Зарегистрированная команда (Command)
+    """
+    global _parser
+    command = Command(name, handler, aliases, missing_arg, steps)
+    _commands[name] = command
+    _parser = None
+    return command
+
+
+def set_instrument(wrap):
+    """Устанавливает обёртку обработчиков команд и возвращает прежнюю.
+
+    Обёртка применяется при сборке таблицы поиска, поэтому без неё
+    диспетчер вызывает исходные обработчики напрямую (см. metrics).
+
+    Args:
+        wrap: Функция wrap(command) -> Command или None
+
+    Returns:
+        Прежняя обёртка или None
+    """
+    global _instrument, _parser
+    previous, _instrument = _instrument, wrap
+    _parser = None
+    return previous
+
+
+def compile_parser():
+    """Строит таблицу поиска по названиям, синонимам и префиксам.
+
+    Полные названия и синонимы всегда узнаются точно. Префикс попадает
+    в таблицу, только если он однозначно указывает на одну команду.
+
+    Returns:
+        Словарь {слово: Command}
+    """
+    exact = {}
+    for command in _commands.values():
+        if _instrument is not None:
+            command = _instrument(command)
+        for word in (command.name, *command.aliases):
+            exact[word] = command
+
+    prefixes = {}
+    for word, command in exact.items():
+        for length in range(1, len(word)):
+            prefixes.setdefault(word[:length], set()).add(command)
+
+    table = {
+        prefix: owners.pop()
+        for prefix, owners in prefixes.items()
+        if len(owners) == 1
+    }
+    table.update(exact)
+    return table
+
+
+def parse_command(command_line):
+    """Разбирает строку на команду и аргумент.
+
+    Args:
+        command_line: Строка ввода пользователя
+
+    Returns:
+        Пара (Command или None, аргумент в нижнем регистре или None);
+        для строки из одних пробелов — (None, None)
+    """
+    global _parser, _unknown
+    if _parser is None:
+        _parser = compile_parser()
+        _unknown = _UNKNOWN if _instrument is None else _instrument(_UNKNOWN)
+
+    parts = command_line.split(maxsplit=1)
+    if not parts:
+        return None, None
+    command = _parser.get(parts[0].lower())
+    arg = parts[1].lower() if len(parts) > 1 else None
+    return command, arg
+
+
+def dispatch_steps(game_state, command_line):
+    """Выполняет команду по таблице диспетчера (пошагово).
+
+    Args:
+        game_state: Состояние игры (GameState)
+        command_line: Строка ввода пользователя
+
+    Yields:
+        Приглашения для ввода, которые запрашивают пошаговые команды
+    """
+    # Пустая строка и строка из пробелов ничего не делают: сценарии,
+    # montecarlo и шарды передают строки без strip()
+    if not command_line or command_line.isspace():
+        return
+
+    command, arg = parse_command(command_line)
+    if command is None:
+        command = _unknown
+    if command.missing_arg is not None and not arg:
+        say(command.missing_arg)
+    elif command.steps:
+        yield from command.handler(game_state, arg)
+    else:
+        command.handler(game_state, arg)
+
+
+def _unknown_command(game_state, arg):
+    say(UNKNOWN_COMMAND)
+
+
+# Не регистрируется: получает строки, не найденные в таблице поиска
+_UNKNOWN = Command("unknown", _unknown_command)
+
+
+def _solve(game_state, arg):
+    current_room = game_state.current_room
+    room_items = get_room(game_state, current_room)["items"]
+    if current_room == "treasure_room" and "treasure_chest" in room_items:
+        yield from attempt_open_treasure_steps(game_state)
+    else:
+        yield from solve_puzzle_steps(game_state)
+
+
+def _quit(game_state, arg):
+    say(f"\nИгра завершена. Сделано шагов: {game_state.steps_taken}")
+    finish_game(game_state, "quit", "command")
+
+
+def _register_direction(direction):
+    def handler(game_state, arg):
+        move_player(game_state, direction)
+
+    register_command(direction, handler)
+
+
+register_command(
+    "go", move_player,
+    missing_arg="Укажите направление (north/south/east/west).",
+)
+for _direction in ("north", "south", "east", "west"):
+    _register_direction(_direction)
+register_command("travel", travel, missing_arg="Укажите комнату.")
+register_command("look", lambda game_state, arg: describe_current_room(game_state))
+register_command("take", take_item, missing_arg="Укажите предмет для поднятия.")
+register_command(
+    "use", use_item,
+    missing_arg="Укажите предмет для использования.",
+)
+register_command(
+    "inventory", lambda game_state, arg: show_inventory(game_state),
+    aliases=("inv",),
+)
+register_command("solve", _solve, steps=True)
+register_command("help", lambda game_state, arg: show_help())
+register_command("quit", _quit, aliases=("exit",))
@@ -50,6 +50,7 @@ ROOMS = {
 
 COMMANDS = {
     "go <direction>": "перейти в направлении (north/south/east/west)",
+    "travel <room>": "дойти до комнаты кратчайшим путём",
     "look": "осмотреть текущую комнату",
     "take <item>": "поднять предмет",
     "use <item>": "использовать предмет из инвентаря",
@@ -65,3 +66,39 @@ EVENT_TYPES = 3             # Количество типов событий
 TRAP_DAMAGE_THRESHOLD = 3   # Порог урона от ловушки (из 10)
 TRAP_INSTANT_DEATH = True   # Ловушка в темноте = мгновенный проигрыш
 MAX_PUZZLE_ATTEMPTS = 3    # Максимум попыток для загадки
+
+# Сколько шагов служат предметы, если у сессии есть часы мира
+ITEM_LIFETIMES = {
+    'torch': 40,
+}
+
+# Запертые комнаты: войти можно, только если ключ есть в инвентаре
+ROOM_KEYS = {
+    'treasure_room': 'rusty_key',
+}
+
+# Другие верные формы ответов (ключ — нормализованный ответ, см. puzzles.py)
+ANSWER_ALIASES = {
+    '10': ('десять',),
+    'шаг шаг шаг': ('шагшагшаг',),
+}
+
+# Последствия загадок по комнатам: кортежи (эффект, аргументы...).
+# Комната мира может задать свои в ключе 'puzzle_effects'.
+PUZZLE_EFFECTS = {
+    'hall': {
+        'success': (
+            ('say', 'Сундук открылся! Внутри лежит ключ от сокровищницы.'),
+            ('add_item', 'treasure_key'),
+        ),
+    },
+    'library': {
+        'success': (
+            ('say', 'Свиток раскрылся! Внутри указание на расположение ключа.'),
+        ),
+    },
+    'trap_room': {
+        'success': (('say', 'Плиты замерли. Проход безопасен.'),),
+        'failure': (('trap',),),
+    },
+}
@@ -0,0 +1,127 @@
+import os
+from collections import deque
+
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import BufferedSink, NullSink, use_sink
+from labyrinth_game.world import copy_state, create_game_state
+
+
+def run_script(game_state, commands, answers=(), capture_output=False):
+    """Выполняет последовательность команд без консольного ввода-вывода.
+
+    Исходное состояние не изменяется: команды применяются к его копии.
+    Ответы на загадки берутся по порядку из answers. Команды после
+    окончания игры не выполняются.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        commands: Последовательность строк команд
+        answers: Последовательность ответов на запросы команд solve
+        capture_output: Сохранять ли текст, который вывела игра
+
+    Returns:
+        Словарь с ключами state (новое состояние), events (список
+        событий), outcome и cause (исход игры или None), commands_run
+        (число выполненных команд) и output (текст или None)
+
+    Raises:
+        ValueError: Если ответов не хватило на все запросы
+    """
+    state = copy_state(game_state)
+    state.events = []
+    pending_answers = deque(answers)
+    output = BufferedSink() if capture_output else NullSink()
+    commands_run = 0
+
+    with use_sink(output):
+        for command in commands:
+            if state.game_over:
+                break
+            commands_run += 1
+
+            steps = process_command_steps(state, command)
+            try:
+                prompt = next(steps)
+                while True:
+                    if not pending_answers:
+                        steps.close()
+                        raise ValueError(
+                            f"Не хватило ответов для команды {command!r} "
+                            f"(запрос {prompt!r})"
+                        )
+                    prompt = steps.send(pending_answers.popleft())
+            except StopIteration:
+                pass
+
+    return {
+        "state": state,
+        "events": state.events,
+        "outcome": state.outcome,
+        "cause": state.cause,
+        "commands_run": commands_run,
+        "output": output.take() if capture_output else None,
+    }
+
+
+def _run_chunk(chunk, capture_output):
+    """Выполняет пачку сценариев в рабочем процессе.
+
+    Ошибка одного сценария не прерывает остальные.
+    """
+    results = []
+    for index, commands, answers in chunk:
+        try:
+            result = run_script(create_game_state(), commands, answers, capture_output)
+        except ValueError as error:
+            results.append({"index": index, "error": str(error)})
+            continue
+        result["index"] = index
+        results.append(result)
+    return results
+
+
+def run_scripts_parallel(scripts, processes=None, chunksize=256,
+                         capture_output=False):
+    """Выполняет множество сценариев в пуле процессов.
+
+    Сценарии читаются из scripts лениво и отправляются пачками, а число
+    пачек в работе ограничено, поэтому даже миллионы сценариев не
+    накапливаются в памяти. Результаты возвращаются по мере готовности,
+    а не в исходном порядке; порядковый номер сценария лежит в index.
+
+    Args:
+        scripts: Итерируемый объект пар (команды, ответы)
+        processes: Число рабочих процессов (по умолчанию — все ядра)
+        chunksize: Число сценариев в одной пачке
+        capture_output: Сохранять ли текст вывода каждого сценария
+
+    Yields:
+        Результаты run_script с ключом index, а для сценариев с ошибкой —
+        словари с ключами index и error
+    """
+    # Пул процессов нужен только этому режиму, одиночным сценариям — нет
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    processes = processes or os.cpu_count() or 1
+    max_in_flight = processes * 2
+    numbered = (
+        (index, commands, answers)
+        for index, (commands, answers) in enumerate(scripts)
+    )
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                chunk = [script for _, script in zip(range(chunksize), numbered)]
+                if not chunk:
+                    exhausted = True
+                    break
+                in_flight.add(executor.submit(_run_chunk, chunk, capture_output))
+
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
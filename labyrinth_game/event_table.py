@@ -0,0 +1,158 @@
+import math
+
+import numpy as np
+
+from labyrinth_game.constants import EVENT_PROBABILITY, EVENT_TYPES
+from labyrinth_game.rng import pseudo_random
+
+# Синус NumPy может отличаться от math.sin на несколько ULP. Дробная часть
+# от этого сдвигается не больше чем на ~1e-10, поэтому значения, которые
+# ближе этого запаса к границе целого, пересчитываются скалярной функцией.
+BOUNDARY_MARGIN = 1e-9
+
+_tables = {}
+
+
+def pseudo_fraction_batch(seeds):
+    """Вычисляет дробную часть из pseudo_random сразу для массива зёрен.
+
+    Результат может отличаться от скалярного вычисления в последних
+    битах; точные целые значения даёт pseudo_random_batch.
+
+    Args:
+        seeds: Массив или последовательность целых зёрен
+
+    Returns:
+        Массив float64 дробных частей в диапазоне [0, 1)
+    """
+    value = np.sin(np.asarray(seeds, dtype=np.float64) * 12.9898) * 43758.5453
+    return value - np.floor(value)
+
+
+def _exact_floor(seeds, fraction, modulo):
+    """Переводит дробные части в целые, сверяя пограничные значения."""
+    scaled = fraction * modulo
+    result = np.floor(scaled).astype(np.int64)
+    near_boundary = np.abs(scaled - np.rint(scaled)) < BOUNDARY_MARGIN * modulo
+    for index in np.flatnonzero(near_boundary):
+        result[index] = pseudo_random(int(seeds[index]), modulo)
+    return result
+
+
+def pseudo_random_batch(seeds, modulo):
+    """Векторная версия rng.pseudo_random.
+
+    Совпадает со скалярной функцией бит в бит для каждого зерна.
+
+    Args:
+        seeds: Массив или последовательность целых зёрен
+        modulo: Верхняя граница результата [0, modulo)
+
+    Returns:
+        Массив int64 значений в диапазоне [0, modulo)
+    """
+    seeds = np.asarray(seeds, dtype=np.int64)
+    return _exact_floor(seeds, pseudo_fraction_batch(seeds), modulo)
+
+
+def pseudo_random_range(start, stop, modulo):
+    """Вычисляет pseudo_random для всех шагов из диапазона [start, stop).
+
+    Args:
+        start: Первый номер шага
+        stop: Номер шага, следующий за последним
+        modulo: Верхняя граница результата [0, modulo)
+
+    Returns:
+        Массив int64 значений, где элемент i соответствует шагу start + i
+    """
+    return pseudo_random_batch(np.arange(start, stop, dtype=np.int64), modulo)
+
+
+def build_event_table(size, event_probability=EVENT_PROBABILITY,
+                      event_types=EVENT_TYPES):
+    """Строит таблицу исходов случайных событий для шагов [0, size).
+
+    Для каждого числа шагов в таблице лежат те же значения, которые
+    random_event и trigger_trap получили бы от pseudo_random:
+    event_roll — бросок события и урона ловушки, event_happens — случится
+    ли событие, event_type — тип события и fraction — дробная часть для
+    выбора потерянного предмета (см. lost_item_index).
+
+    Args:
+        size: Число шагов в таблице
+        event_probability: Знаменатель вероятности события
+        event_types: Количество типов событий
+
+    Returns:
+        Словарь массивов NumPy длины size
+    """
+    seeds = np.arange(size, dtype=np.int64)
+    fraction = pseudo_fraction_batch(seeds)
+    event_roll = _exact_floor(seeds, fraction, event_probability)
+    return {
+        "fraction": fraction,
+        "event_roll": event_roll,
+        "event_happens": event_roll == 0,
+        "event_type": _exact_floor(seeds, fraction, event_types),
+    }
+
+
+def get_event_table(size, event_probability=EVENT_PROBABILITY,
+                    event_types=EVENT_TYPES):
+    """Возвращает закэшированную таблицу, покрывающую не меньше size шагов.
+
+    При нехватке таблица перестраивается с запасом (вдвое больше), так что
+    постепенный рост числа шагов обходится в амортизированное O(1).
+
+    Args:
+        size: Минимальное число шагов в таблице
+        event_probability: Знаменатель вероятности события
+        event_types: Количество типов событий
+
+    Returns:
+        Словарь массивов NumPy (см. build_event_table)
+    """
+    key = (event_probability, event_types)
+    table = _tables.get(key)
+    if table is None or len(table["fraction"]) < size:
+        current = 0 if table is None else len(table["fraction"])
+        table = build_event_table(max(size, 2 * current, 1024), *key)
+        _tables[key] = table
+    return table
+
+
+def event_at(steps, event_probability=EVENT_PROBABILITY, event_types=EVENT_TYPES):
+    """Возвращает исход случайного события для заданного числа шагов.
+
+    Args:
+        steps: Число шагов игрока
+        event_probability: Знаменатель вероятности события
+        event_types: Количество типов событий
+
+    Returns:
+        Кортеж (случится ли событие, тип события, бросок урона ловушки)
+    """
+    table = get_event_table(steps + 1, event_probability, event_types)
+    return (
+        bool(table["event_happens"][steps]),
+        int(table["event_type"][steps]),
+        int(table["event_roll"][steps]),
+    )
+
+
+def lost_item_index(steps, inventory_size):
+    """Возвращает индекс предмета, который заберёт ловушка.
+
+    Args:
+        steps: Число шагов игрока
+        inventory_size: Число предметов в инвентаре (больше нуля)
+
+    Returns:
+        Индекс предмета, как его выбрала бы trigger_trap
+    """
+    fraction = get_event_table(steps + 1)["fraction"][steps]
+    scaled = float(fraction) * inventory_size
+    if abs(scaled - round(scaled)) < BOUNDARY_MARGIN * inventory_size:
+        return pseudo_random(steps, inventory_size)
+    return math.floor(scaled)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# umask нельзя прочитать, не изменив его, а файлы пишутся и из пула
+# потоков (снимки save.py), поэтому он читается один раз при импорте
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path):
+    """Права для нового файла path: как у заменяемого или как у open()."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_atomic(path, data):
+    """Атомарно заменяет файл: пишет во временный файл рядом и переименовывает.
+
+    У каждой записи свой временный файл, поэтому одновременные записи
+    в один путь (из потоков или процессов) не портят друг друга: файл
+    целиком принадлежит той, что заменила его последней. Права файла
+    сохраняются (NamedTemporaryFile создаёт файл с правами 0600). При
+    ошибке временный файл удаляется.
+
+    Args:
+        path: Путь к файлу
+        data: Байты содержимого
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        dir=directory, prefix=os.path.basename(path) + ".",
+        suffix=".tmp", delete=False,
+    ) as file:
+        temp_path = file.name
+        try:
+            os.fchmod(file.fileno(), _file_mode(path))
+            file.write(data)
+        except BaseException:
+            file.close()
+            os.remove(temp_path)
+            raise
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
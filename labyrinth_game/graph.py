@@ -0,0 +1,133 @@
+import sys
+from array import array
+
+from labyrinth_game.constants import ROOMS
+
+DIRECTIONS = ("north", "south", "east", "west")
+NO_EXIT = -1
+
+_graphs = {}
+
+
+class WorldGraph:
+    """Скомпилированный граф комнат с целочисленными идентификаторами.
+
+    Комнаты, направления и предметы пронумерованы, выходы хранятся в
+    плоской таблице смежности: выход из комнаты room_id в направлении
+    direction_id лежит в exits[room_id * len(directions) + direction_id]
+    (NO_EXIT, если выхода нет). Названия интернированы, поэтому их хэши
+    вычисляются один раз на весь процесс.
+
+    Attributes:
+        room_names: Названия комнат по их идентификаторам
+        room_ids: Идентификаторы комнат по названиям
+        directions: Названия направлений по их идентификаторам
+        direction_ids: Идентификаторы направлений по названиям
+        exits: Таблица смежности array('i')
+        item_names: Названия предметов по их идентификаторам
+        item_ids: Идентификаторы предметов по названиям
+        room_items: Кортежи идентификаторов начальных предметов комнат
+        puzzles: Загадки комнат (или None)
+    """
+
+    __slots__ = (
+        "room_names",
+        "room_ids",
+        "directions",
+        "direction_ids",
+        "exits",
+        "item_names",
+        "item_ids",
+        "room_items",
+        "puzzles",
+    )
+
+    def exit(self, room_id, direction_id):
+        """Возвращает комнату за выходом или NO_EXIT."""
+        return self.exits[room_id * len(self.directions) + direction_id]
+
+    def neighbours(self, room_id):
+        """Возвращает пары (идентификатор направления, соседняя комната)."""
+        width = len(self.directions)
+        row = self.exits[room_id * width:(room_id + 1) * width]
+        return [
+            (direction_id, target)
+            for direction_id, target in enumerate(row)
+            if target != NO_EXIT
+        ]
+
+    def item_id(self, item_name):
+        """Возвращает идентификатор предмета, добавляя новый при необходимости."""
+        item_id = self.item_ids.get(item_name)
+        if item_id is None:
+            item_id = len(self.item_names)
+            item_name = sys.intern(item_name)
+            self.item_names.append(item_name)
+            self.item_ids[item_name] = item_id
+        return item_id
+
+
+def compile_world(rooms=ROOMS):
+    """Компилирует словарь комнат в WorldGraph.
+
+    Args:
+        rooms: Словарь комнат в формате ROOMS
+
+    Returns:
+        Скомпилированный граф (WorldGraph)
+
+    Raises:
+        ValueError: Если выход ведёт в несуществующую комнату
+    """
+    graph = WorldGraph()
+    graph.room_names = [sys.intern(name) for name in rooms]
+    graph.room_ids = {name: room_id for room_id, name in enumerate(graph.room_names)}
+
+    directions = list(DIRECTIONS)
+    for room in rooms.values():
+        for direction in room["exits"]:
+            if direction not in directions:
+                directions.append(direction)
+    graph.directions = tuple(sys.intern(direction) for direction in directions)
+    graph.direction_ids = {
+        direction: direction_id
+        for direction_id, direction in enumerate(graph.directions)
+    }
+
+    width = len(graph.directions)
+    graph.exits = array("i", [NO_EXIT]) * (len(graph.room_names) * width)
+    graph.item_names = []
+    graph.item_ids = {}
+    graph.room_items = []
+    graph.puzzles = []
+
+    for room_id, (name, room) in enumerate(rooms.items()):
+        for direction, target in room["exits"].items():
+            if target not in graph.room_ids:
+                raise ValueError(
+                    f"Выход {direction!r} из комнаты {name!r} ведёт "
+                    f"в неизвестную комнату {target!r}"
+                )
+            graph.exits[room_id * width + graph.direction_ids[direction]] = (
+                graph.room_ids[target]
+            )
+        graph.room_items.append(tuple(graph.item_id(item) for item in room["items"]))
+        graph.puzzles.append(room["puzzle"])
+
+    return graph
+
+
+def get_graph(world=ROOMS):
+    """Возвращает скомпилированный граф мира, компилируя его один раз.
+
+    Args:
+        world: Словарь комнат в формате ROOMS
+
+    Returns:
+        Скомпилированный граф (WorldGraph)
+    """
+    entry = _graphs.get(id(world))
+    if entry is None or entry[0] is not world:
+        entry = (world, compile_world(world))
+        _graphs[id(world)] = entry
+    return entry[1]
@@ -0,0 +1,273 @@
+import argparse
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+# Сколько завершённых игр записывать одной транзакцией
+BATCH_SIZE = 1000
+
+# Как часто flush проверяет, жив ли поток записи, секунды
+_FLUSH_POLL = 0.1
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        finished REAL NOT NULL,
+        outcome TEXT NOT NULL,
+        cause TEXT,
+        steps INTEGER NOT NULL,
+        duration REAL NOT NULL,
+        inventory TEXT NOT NULL
+    )
+    """,
+    # Таблица лидеров и сводка по исходам читают только этот индекс
+    """
+    CREATE INDEX IF NOT EXISTS runs_outcome_steps
+        ON runs (outcome, steps, duration)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS runs_outcome_cause
+        ON runs (outcome, cause)
+    """,
+)
+_INSERT = (
+    "INSERT INTO runs (finished, outcome, cause, steps, duration, inventory) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_STOP = None
+
+
+def _connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # В режиме WAL NORMAL не теряет целостность, а fsync идёт лишь
+    # на контрольных точках
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class RunHistory:
+    """История завершённых игр в базе SQLite (режим WAL).
+
+    record только ставит запись в очередь; фоновый поток забирает всё,
+    что накопилось, и пишет одной транзакцией, поэтому игровой цикл не
+    ждёт диска, а при потоке завершений записи сами собираются в пачки.
+    Читать историю можно параллельно с записью. Если пачка не
+    записалась, её записи повторяются по одной, так что теряются лишь
+    сами ошибочные записи.
+
+    Attributes:
+        path: Путь к файлу базы
+        batch_size: Наибольшее число записей в одной транзакции
+        written: Число записанных игр
+        error: Первая ошибка записи (sqlite3.Error) или None
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.written = 0
+        self.error = None
+        self._crash = None
+        self._queue = queue.Queue()
+        self._reader = None
+
+        # Схема создаётся сразу, чтобы запросы работали до первой записи
+        connection = _connect(path)
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+        connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def record(self, game_state, duration):
+        """Ставит завершённую игру в очередь на запись.
+
+        Args:
+            game_state: Состояние законченной игры (GameState)
+            duration: Длительность игры в секундах
+        """
+        inventory = json.dumps(
+            dict(game_state.player_inventory.items()), ensure_ascii=False,
+        )
+        self._queue.put((
+            time.time(),
+            game_state.outcome,
+            game_state.cause,
+            game_state.steps_taken,
+            duration,
+            inventory,
+        ))
+
+    def _write_loop(self):
+        # Неожиданная ошибка (диск при открытии базы, закрытое соединение)
+        # останавливает поток; flush и close поднимают её из _crash
+        try:
+            connection = _connect(self.path)
+            try:
+                self._write_batches(connection)
+            finally:
+                connection.close()
+        except Exception as error:
+            self._crash = error
+
+    def _write_batches(self, connection):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                running = False
+                batch = [row for row in batch if row is not _STOP]
+
+            try:
+                with connection:
+                    connection.executemany(_INSERT, batch)
+                self.written += len(batch)
+            except sqlite3.Error:
+                for row in batch:
+                    self._write_row(connection, row)
+            for _ in range(len(batch) + (not running)):
+                self._queue.task_done()
+
+    def _write_row(self, connection, row):
+        try:
+            with connection:
+                connection.execute(_INSERT, row)
+            self.written += 1
+        except sqlite3.Error as error:
+            if self.error is None:
+                self.error = error
+
+    def flush(self):
+        """Ждёт, пока все поставленные в очередь игры будут записаны.
+
+        Raises:
+            Exception: Ошибка, остановившая поток записи: без него очередь
+                не опустеет, поэтому flush не ждёт её вечно
+        """
+        done = self._queue.all_tasks_done
+        with done:
+            while self._queue.unfinished_tasks and self._writer.is_alive():
+                done.wait(_FLUSH_POLL)
+        if self._crash is not None:
+            raise self._crash
+
+    def _query(self, sql, parameters=()):
+        if self._reader is None:
+            self._reader = sqlite3.connect(self.path, check_same_thread=False)
+        return self._reader.execute(sql, parameters).fetchall()
+
+    def leaderboard(self, limit=10, outcome="win"):
+        """Возвращает лучшие игры с исходом outcome: меньше шагов — выше.
+
+        Returns:
+            Список словарей с ключами steps, duration, cause, inventory
+            и finished
+        """
+        rows = self._query(
+            "SELECT steps, duration, cause, inventory, finished FROM runs "
+            "WHERE outcome = ? ORDER BY steps, duration LIMIT ?",
+            (outcome, limit),
+        )
+        return [
+            {
+                "steps": steps,
+                "duration": duration,
+                "cause": cause,
+                "inventory": json.loads(inventory),
+                "finished": finished,
+            }
+            for steps, duration, cause, inventory, finished in rows
+        ]
+
+    def summary(self):
+        """Возвращает сводку по исходам.
+
+        Returns:
+            Словарь {исход: словарь с ключами runs, min_steps, mean_steps
+            и mean_duration}
+        """
+        rows = self._query(
+            "SELECT outcome, COUNT(*), MIN(steps), AVG(steps), AVG(duration) "
+            "FROM runs GROUP BY outcome"
+        )
+        return {
+            outcome: {
+                "runs": runs,
+                "min_steps": min_steps,
+                "mean_steps": mean_steps,
+                "mean_duration": mean_duration,
+            }
+            for outcome, runs, min_steps, mean_steps, mean_duration in rows
+        }
+
+    def causes(self):
+        """Возвращает число игр по парам (исход, причина)."""
+        rows = self._query(
+            "SELECT outcome, cause, COUNT(*) FROM runs GROUP BY outcome, cause"
+        )
+        return {(outcome, cause): count for outcome, cause, count in rows}
+
+    def close(self):
+        """Дописывает очередь, останавливает поток записи и закрывает базу.
+
+        Raises:
+            Exception: Ошибка, остановившая поток записи
+            sqlite3.Error: Первая ошибка записи, если часть игр не записалась
+        """
+        stopped = self._writer.is_alive()
+        if stopped:
+            self._queue.put(_STOP)
+            self._writer.join()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._crash is not None:
+            raise self._crash
+        if stopped and self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """Точка входа: печатает таблицу лидеров и сводку по исходам."""
+    parser = argparse.ArgumentParser(
+        description="История игр Лабиринта сокровищ",
+    )
+    parser.add_argument("path", help="файл базы истории")
+    parser.add_argument("--top", type=int, default=10,
+                        help="сколько лучших побед показать")
+    args = parser.parse_args()
+
+    with RunHistory(args.path) as history:
+        print("Лучшие победы:")
+        for place, run in enumerate(history.leaderboard(args.top), 1):
+            print(f"  {place:>3}. шагов: {run['steps']}, "
+                  f"время: {run['duration']:.1f} с")
+        print("\nИсходы:")
+        for outcome, stats in sorted(history.summary().items()):
+            print(f"  {outcome:<6} игр: {stats['runs']}, "
+                  f"шагов: мин. {stats['min_steps']}, "
+                  f"среднее {stats['mean_steps']:.1f}")
+        for (outcome, cause), count in sorted(history.causes().items(),
+                                              key=lambda pair: -pair[1]):
+            print(f"  {outcome}/{cause}: {count}")
+
+
+if __name__ == "__main__":
+    main()
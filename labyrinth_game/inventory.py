@@ -0,0 +1,111 @@
+from itertools import islice
+
+
+class Inventory:
+    """Инвентарь игрока: одинаковые предметы складываются в стопки.
+
+    Слоты — ключи словаря {предмет: количество}, который хранит порядок
+    добавления. Проверка наличия, добавление и удаление работают за O(1)
+    и не меняют порядок остальных слотов, поэтому ловушка выбирает тот же
+    предмет, что и в прежнем списке. Доступ к слоту по номеру (pop)
+    проходит слоты по порядку, но различных предметов в игре единицы.
+
+    Итерация и len() считают предметы поштучно, как в списке, где
+    одинаковые предметы повторяются.
+    """
+
+    __slots__ = ("_counts", "_size")
+
+    def __init__(self, items=()):
+        self._counts = {}
+        self._size = 0
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def from_counts(cls, pairs):
+        """Создаёт инвентарь из пар (предмет, количество)."""
+        inventory = cls()
+        for item, count in pairs:
+            inventory.add(item, count)
+        return inventory
+
+    def add(self, item, count=1):
+        """Кладёт count штук предмета (в конец, если его ещё не было)."""
+        if count <= 0:
+            return
+        self._counts[item] = self._counts.get(item, 0) + count
+        self._size += count
+
+    def remove(self, item):
+        """Убирает одну штуку предмета.
+
+        Raises:
+            ValueError: Если предмета нет, как у list.remove
+        """
+        if item not in self._counts:
+            raise ValueError(f"{item!r} нет в инвентаре")
+        self._take(item)
+
+    def pop(self, slot=-1):
+        """Убирает одну штуку предмета из слота и возвращает предмет.
+
+        Args:
+            slot: Номер слота в [0, slot_count()) или отрицательный,
+                как индекс списка
+
+        Raises:
+            IndexError: Если слота нет
+        """
+        if not self._counts:
+            raise IndexError("инвентарь пуст")
+        slot = range(len(self._counts))[slot]
+        return self._take(next(islice(self._counts, slot, None)))
+
+    def _take(self, item):
+        self._size -= 1
+        if self._counts[item] > 1:
+            self._counts[item] -= 1
+        else:
+            del self._counts[item]
+        return item
+
+    def count(self, item):
+        """Возвращает число штук предмета."""
+        return self._counts.get(item, 0)
+
+    def slot_count(self):
+        """Возвращает число различных предметов (слотов)."""
+        return len(self._counts)
+
+    def items(self):
+        """Возвращает пары (предмет, количество) в порядке слотов."""
+        return list(self._counts.items())
+
+    def copy(self):
+        inventory = Inventory()
+        inventory._counts = self._counts.copy()
+        inventory._size = self._size
+        return inventory
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for item, count in self._counts.items():
+            for _ in range(count):
+                yield item
+
+    def __eq__(self, other):
+        if isinstance(other, Inventory):
+            return self._counts == other._counts
+        return NotImplemented
+
+    def __reduce__(self):
+        return Inventory.from_counts, (self.items(),)
+
+    def __repr__(self):
+        return f"Inventory({list(self)!r})"
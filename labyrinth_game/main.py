@@ -1,102 +1,148 @@
 import sys
+import time
 
+from labyrinth_game.commands import dispatch_steps
 from labyrinth_game.constants import ROOMS
-from labyrinth_game.player_actions import (
-    get_input,
-    move_player,
-    show_inventory,
-    take_item,
-    use_item,
-)
-from labyrinth_game.utils import (
-    attempt_open_treasure,
-    describe_current_room,
-    show_help,
-    solve_puzzle,
-)
-
-sys.stdin.reconfigure(encoding="utf-8")
-sys.stdout.reconfigure(encoding="utf-8")
-
-game_state = {
-    "player_inventory": [],
-    "current_room": "entrance",
-    "game_over": False,
-    "steps_taken": 0,
-}
+from labyrinth_game.output import flush_output, say
+from labyrinth_game.player_actions import get_input
+from labyrinth_game.rng import SIN_RNG, CounterRandom
+from labyrinth_game.utils import describe_current_room, run_prompts, show_help
+from labyrinth_game.world import create_game_state
 
+# Через сколько ходов сохранение делает новый снимок
+CHECKPOINT_EVERY = 50
 
-def process_command(game_state, command_line):
-    """Обрабатывает пользовательскую команду и вызывает соответствующую функцию.
+
+def process_command_steps(game_state, command_line):
+    """Пошаговая версия process_command (см. utils.run_prompts).
+    
+    Команда ищется в таблице commands: по названию, синониму или
+    однозначному префиксу.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
         command_line: Строка ввода пользователя
+    
+    Yields:
+        Приглашения для ввода, которые запрашивают команды solve
     """
-    if not command_line:
-        return
-
-    parts = command_line.split(maxsplit=1)
-    cmd = parts[0].lower()
-    arg = parts[1] if len(parts) > 1 else None
+    yield from dispatch_steps(game_state, command_line)
 
-    match cmd:
-        case "go":
-            if arg:
-                move_player(game_state, arg.lower())
-            else:
-                print("Укажите направление (north/south/east/west).")
 
-        case "north" | "south" | "east" | "west":
-            move_player(game_state, cmd)
-
-        case "look":
-            describe_current_room(game_state)
+def process_command(game_state, command_line):
+    """Обрабатывает пользовательскую команду и вызывает соответствующую функцию.
+    
+    Ответы на загадки запрашиваются через input().
+    
+    Args:
+        game_state: Состояние игры (GameState)
+        command_line: Строка ввода пользователя
+    """
+    run_prompts(process_command_steps(game_state, command_line))
 
-        case "take":
-            if arg:
-                take_item(game_state, arg.lower())
-            else:
-                print("Укажите предмет для поднятия.")
 
-        case "use":
-            if arg:
-                use_item(game_state, arg.lower())
-            else:
-                print("Укажите предмет для использования.")
+def _recording_input(answers):
+    """Возвращает функцию ввода, которая запоминает ответы игрока."""
+    def ask(prompt):
+        answer = input(prompt)
+        answers.append(answer)
+        return answer
 
-        case "inventory" | "inv":
-            show_inventory(game_state)
+    return ask
 
-        case "solve":
-            current_room = game_state["current_room"]
-            room_items = ROOMS[current_room]["items"]
-            if current_room == "treasure_room" and "treasure_chest" in room_items:
-                attempt_open_treasure(game_state)
-            else:
-                solve_puzzle(game_state)
 
-        case "help":
-            show_help()
+def main():
+    """Точка входа в игру. Инициализирует игровой цикл.
+    
+    С параметром --save каждый ход дописывается в журнал сохранения,
+    и следующий запуск продолжает игру с места выхода. С параметром
+    --metrics при выходе записываются метрики команд и событий, а с
+    --timers у сессии есть часы мира (см. world.create_game_state).
+    С --history законченная игра попадает в историю (см. history.py).
+    
+    Кодировка консоли и разбор аргументов настраиваются только здесь:
+    импорт модуля не имеет побочных эффектов.
+    """
+    import argparse
+
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Лабиринт сокровищ")
+    parser.add_argument("--save", metavar="PATH",
+                        help="файл сохранения (без расширения)")
+    parser.add_argument("--seed", type=int,
+                        help="ключ счётчикового генератора событий "
+                             "(по умолчанию прежняя последовательность)")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="записать метрики в PATH.json и PATH.prom")
+    parser.add_argument("--world", metavar="PATH",
+                        help="файл мира (см. labyrinth_game.worldfile)")
+    parser.add_argument("--timers", action="store_true",
+                        help="часы мира: события по шагам, например "
+                             "догорающий факел")
+    parser.add_argument("--history", metavar="PATH",
+                        help="записать законченную игру в базу истории")
+    args = parser.parse_args()
+
+    world = ROOMS
+    if args.world:
+        from labyrinth_game.worldfile import load_world
+
+        world = load_world(args.world)
+
+    rng = SIN_RNG if args.seed is None else CounterRandom(args.seed)
+    state = create_game_state(world, rng, args.timers)
+    slot = None
+    if args.save:
+        from labyrinth_game.save import SaveSlot
+
+        slot = SaveSlot(args.save, world, rng, args.timers)
+        state = slot.load()
+        if state.game_over:
+            slot.reset()
+            state = slot.load()
+
+    # Метрики включаются после загрузки: повтор журнала в них не входит
+    metrics = None
+    if args.metrics:
+        from labyrinth_game.metrics import enable_metrics
+
+        metrics = enable_metrics()
+        metrics.attach(state)
+
+    say("Добро пожаловать в Лабиринт сокровищ!")
+    describe_current_room(state)
+    show_help()
 
-        case "quit" | "exit":
-            print(f"\nИгра завершена. Сделано шагов: {game_state['steps_taken']}")
-            game_state["game_over"] = True
+    started = time.monotonic()
+    turns = 0
+    while not state.game_over:
+        flush_output()
+        command = get_input()
+        answers = []
+        run_prompts(process_command_steps(state, command), _recording_input(answers))
 
-        case _:
-            print("Неизвестная команда. Введите 'help' для списка команд.")
+        # Выход командой quit не записывается: сохранение остаётся открытым
+        if slot is not None and state.outcome != "quit":
+            slot.record(command, answers)
+            turns += 1
+            if turns % CHECKPOINT_EVERY == 0:
+                slot.checkpoint(state)
+    flush_output()
 
+    if slot is not None:
+        slot.close()
+    if metrics is not None:
+        from labyrinth_game.metrics import write_metrics
 
-def main():
-    """Точка входа в игру. Инициализирует игровой цикл."""
-    print("Добро пожаловать в Лабиринт сокровищ!")
-    describe_current_room(game_state)
-    show_help()
+        write_metrics(metrics, args.metrics)
+    if args.history:
+        from labyrinth_game.history import RunHistory
 
-    while not game_state["game_over"]:
-        command = get_input()
-        process_command(game_state, command)
+        with RunHistory(args.history) as history:
+            history.record(state, time.monotonic() - started)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,342 @@
+import bisect
+import contextlib
+import json
+import time
+
+from labyrinth_game import commands
+from labyrinth_game.fileio import write_atomic
+
+# Верхние границы корзин гистограммы задержки, секунды
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)
+# Типы событий, счётчики которых существуют с самого начала
+EVENT_KINDS = (
+    "move", "take", "trap", "random_event", "wear_out",
+    "puzzle_solved", "puzzle_failed", "win", "loss", "quit",
+)
+
+
+class Histogram:
+    """Гистограмма с заранее выделенными корзинами.
+
+    Attributes:
+        bounds: Верхние границы корзин по возрастанию
+        counts: Число наблюдений в каждой корзине; последняя — +Inf
+        total: Сумма наблюдений
+        count: Число наблюдений
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """Возвращает пары (граница, наблюдений не больше неё), как в Prometheus."""
+        pairs = []
+        running = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+
+class CommandStats:
+    """Счётчик вызовов и гистограмма задержки одной команды.
+
+    Attributes:
+        calls: Число вызовов обработчика
+        latency: Гистограмма задержки замеренных вызовов (Histogram)
+    """
+
+    __slots__ = ("calls", "latency")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.calls = 0
+        self.latency = Histogram(bounds)
+
+
+class EventCounter:
+    """Приёмник событий сессии, считающий их по типам.
+
+    Подставляется в GameState.events (см. world.record_event) и при
+    необходимости передаёт события дальше, в прежний список сессии.
+
+    Attributes:
+        counts: Словарь {тип события: число}
+        causes: Словарь {(исход, причина): число}
+        target: Список, куда события передаются дальше, или None
+    """
+
+    __slots__ = ("counts", "causes", "target")
+
+    def __init__(self, counts, causes, target=None):
+        self.counts = counts
+        self.causes = causes
+        self.target = target
+
+    def append(self, event):
+        kind, details = event
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        cause = details.get("cause")
+        if cause is not None:
+            key = (kind, cause)
+            self.causes[key] = self.causes.get(key, 0) + 1
+        if self.target is not None:
+            self.target.append(event)
+
+    def __iter__(self):
+        return iter(self.target or ())
+
+    def __len__(self):
+        return len(self.target or ())
+
+
+class Metrics:
+    """Метрики процесса: команды, их задержки и игровые события.
+
+    Счётчики вызовов точные, а задержка замеряется у каждого
+    sample_every-го вызова команды, чтобы частые дешёвые команды не
+    платили за вызовы таймера.
+
+    Attributes:
+        sample_every: Замерять задержку каждого N-го вызова команды
+        bounds: Верхние границы корзин гистограмм задержки
+        commands: Словарь {команда: CommandStats}
+        events: Словарь {тип события: число}
+        causes: Словарь {(исход, причина): число}
+        started: Время создания (time.time())
+    """
+
+    def __init__(self, sample_every=1, bounds=LATENCY_BUCKETS):
+        if sample_every < 1:
+            raise ValueError("sample_every должен быть не меньше 1")
+        self.sample_every = sample_every
+        self.bounds = tuple(bounds)
+        self.commands = {}
+        self.events = dict.fromkeys(EVENT_KINDS, 0)
+        self.causes = {}
+        self.started = time.time()
+
+    def command(self, name):
+        """Возвращает статистику команды, создавая её при первом обращении."""
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats(self.bounds)
+        return stats
+
+    def attach(self, game_state):
+        """Подключает подсчёт событий к сессии.
+
+        Уже собираемые события сессии (список events) продолжают
+        собираться.
+
+        Args:
+            game_state: Состояние игры (GameState)
+        """
+        game_state.events = EventCounter(self.events, self.causes, game_state.events)
+
+    def instrument(self, command):
+        """Оборачивает обработчик команды замером времени.
+
+        Args:
+            command: Зарегистрированная команда (commands.Command)
+
+        Returns:
+            Новая команда (commands.Command) с тем же поведением
+        """
+        stats = self.command(command.name)
+        handler = command.handler
+        sample_every = self.sample_every
+        clock = time.perf_counter
+
+        if command.steps:
+            def timed(game_state, arg):
+                stats.calls += 1
+                if stats.calls % sample_every:
+                    yield from handler(game_state, arg)
+                    return
+                # Время ожидания ответа игрока в задержку не входит
+                steps = handler(game_state, arg)
+                elapsed = 0.0
+                answer = None
+                try:
+                    while True:
+                        start = clock()
+                        try:
+                            prompt = steps.send(answer)
+                        finally:
+                            elapsed += clock() - start
+                        answer = yield prompt
+                except StopIteration:
+                    pass
+                finally:
+                    steps.close()
+                    stats.latency.observe(elapsed)
+        else:
+            def timed(game_state, arg):
+                stats.calls += 1
+                if stats.calls % sample_every:
+                    handler(game_state, arg)
+                    return
+                start = clock()
+                try:
+                    handler(game_state, arg)
+                finally:
+                    stats.latency.observe(clock() - start)
+
+        return commands.Command(
+            command.name, timed, command.aliases, command.missing_arg, command.steps,
+        )
+
+    def snapshot(self):
+        """Возвращает метрики в виде словаря для JSON."""
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started,
+            "sample_every": self.sample_every,
+            "commands": {
+                name: {
+                    "calls": stats.calls,
+                    "sampled": stats.latency.count,
+                    "latency_sum_seconds": stats.latency.total,
+                    "latency_buckets": [
+                        ["+Inf" if bound == float("inf") else bound, count]
+                        for bound, count in stats.latency.cumulative()
+                    ],
+                }
+                for name, stats in sorted(self.commands.items())
+            },
+            "events": dict(self.events),
+            "puzzle_attempts": (
+                self.events["puzzle_solved"] + self.events["puzzle_failed"]
+            ),
+            "outcomes": {
+                f"{outcome}:{cause}": count
+                for (outcome, cause), count in sorted(self.causes.items())
+            },
+        }
+
+    def to_prometheus(self):
+        """Возвращает метрики в текстовом формате Prometheus."""
+        lines = [
+            "# HELP labyrinth_command_calls_total Число выполненных команд.",
+            "# TYPE labyrinth_command_calls_total counter",
+        ]
+        for name, stats in sorted(self.commands.items()):
+            lines.append(f'labyrinth_command_calls_total{{command="{name}"}} '
+                         f"{stats.calls}")
+
+        lines += [
+            "# HELP labyrinth_command_latency_seconds Задержка команд "
+            "(замеренные вызовы).",
+            "# TYPE labyrinth_command_latency_seconds histogram",
+        ]
+        for name, stats in sorted(self.commands.items()):
+            for bound, count in stats.latency.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'labyrinth_command_latency_seconds_bucket'
+                             f'{{command="{name}",le="{le}"}} {count}')
+            lines.append(f'labyrinth_command_latency_seconds_sum'
+                         f'{{command="{name}"}} {stats.latency.total!r}')
+            lines.append(f'labyrinth_command_latency_seconds_count'
+                         f'{{command="{name}"}} {stats.latency.count}')
+
+        lines += [
+            "# HELP labyrinth_events_total Игровые события по типам.",
+            "# TYPE labyrinth_events_total counter",
+        ]
+        for kind, count in sorted(self.events.items()):
+            lines.append(f'labyrinth_events_total{{kind="{kind}"}} {count}')
+
+        lines += [
+            "# HELP labyrinth_puzzle_attempts_total Попытки решить загадку.",
+            "# TYPE labyrinth_puzzle_attempts_total counter",
+            "labyrinth_puzzle_attempts_total "
+            f"{self.events['puzzle_solved'] + self.events['puzzle_failed']}",
+            "# HELP labyrinth_outcomes_total Завершённые игры по исходу и причине.",
+            "# TYPE labyrinth_outcomes_total counter",
+        ]
+        for (outcome, cause), count in sorted(self.causes.items()):
+            lines.append(f'labyrinth_outcomes_total'
+                         f'{{outcome="{outcome}",cause="{cause}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """Атомарно записывает снимок метрик в JSON-файл."""
+        text = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        write_atomic(path, text.encode("utf-8"))
+
+    def write_prometheus(self, path):
+        """Атомарно записывает метрики в текстовый файл Prometheus.
+
+        Файл подходит для textfile collector в node_exporter.
+        """
+        write_atomic(path, self.to_prometheus().encode("utf-8"))
+
+
+_metrics = None
+
+
+def get_metrics():
+    """Возвращает включённые метрики или None."""
+    return _metrics
+
+
+def enable_metrics(metrics=None):
+    """Включает сбор метрик команд.
+
+    Обработчики в таблице команд заменяются обёртками с замером времени.
+    Пока метрики выключены, таблица содержит исходные обработчики, и
+    на ход игры сбор никак не влияет.
+
+    Args:
+        metrics: Объект Metrics; по умолчанию создаётся новый
+
+    Returns:
+        Включённые метрики (Metrics)
+    """
+    global _metrics
+    _metrics = metrics or Metrics()
+    commands.set_instrument(_metrics.instrument)
+    return _metrics
+
+
+def disable_metrics():
+    """Выключает сбор метрик и возвращает исходные обработчики команд."""
+    global _metrics
+    _metrics = None
+    commands.set_instrument(None)
+
+
+@contextlib.contextmanager
+def use_metrics(metrics=None):
+    """Временно включает сбор метрик.
+
+    Args:
+        metrics: Объект Metrics; по умолчанию создаётся новый
+    """
+    previous = _metrics
+    try:
+        yield enable_metrics(metrics)
+    finally:
+        if previous is None:
+            disable_metrics()
+        else:
+            enable_metrics(previous)
+
+
+def write_metrics(metrics, path):
+    """Записывает метрики в path.json и path.prom."""
+    metrics.write_json(f"{path}.json")
+    metrics.write_prometheus(f"{path}.prom")
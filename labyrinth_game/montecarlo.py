@@ -0,0 +1,352 @@
+import argparse
+import contextlib
+import os
+import random
+from collections import Counter
+
+from labyrinth_game import constants, utils
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import NullSink, use_sink
+from labyrinth_game.rng import SIN_RNG, CounterRandom
+from labyrinth_game.solver import WRONG_ANSWER, candidate_actions, solve
+from labyrinth_game.world import create_game_state, get_room
+
+# Константы, которые можно подменить на время оценки: {имя: модули,
+# читающие её как глобальную переменную}
+TUNABLE = {
+    "EVENT_PROBABILITY": (constants, utils),
+    "EVENT_TYPES": (constants, utils),
+    "TRAP_DAMAGE_THRESHOLD": (constants, utils),
+    "MAX_PUZZLE_ATTEMPTS": (constants, utils),
+}
+
+DEFAULT_MAX_COMMANDS = 200
+CHUNK_SIZE = 2000
+TIMEOUT = "timeout"
+
+
+@contextlib.contextmanager
+def override_constants(**values):
+    """Временно подменяет настроечные константы игры.
+
+    Игровая логика читает константы как глобальные переменные модулей,
+    поэтому подмена не требует перезапуска процесса или повторного
+    импорта.
+
+    Args:
+        **values: Новые значения констант из TUNABLE
+
+    Raises:
+        KeyError: Если константа не входит в TUNABLE
+    """
+    saved = []
+    try:
+        for name, value in values.items():
+            for module in TUNABLE[name]:
+                saved.append((module, name, getattr(module, name)))
+                setattr(module, name, value)
+        yield
+    finally:
+        for module, name, value in reversed(saved):
+            setattr(module, name, value)
+
+
+def random_walker(game_state, rng, memory):
+    """Выбирает случайное допустимое действие (см. solver.candidate_actions)."""
+    return rng.choice(candidate_actions(game_state))
+
+
+def greedy_collector(game_state, rng, memory):
+    """Собирает всё, что видит, и обходит лабиринт, предпочитая новые комнаты.
+
+    Загадки решает верно, сундук открывает ключом или кодом.
+    """
+    room_name = game_state.current_room
+    room = get_room(game_state, room_name)
+    inventory = game_state.player_inventory
+    visits = memory.setdefault("visits", Counter())
+    visits[room_name] += 1
+
+    if "treasure_chest" in room["items"]:
+        if "treasure_key" in inventory:
+            return "solve", ()
+        if room["puzzle"] is not None:
+            return "solve", ("да", room["puzzle"][1])
+
+    if room["puzzle"] is not None:
+        return "solve", (room["puzzle"][1],)
+
+    for item in room["items"]:
+        if item != "treasure_chest":
+            return f"take {item}", ()
+
+    if "bronze_box" in inventory and "rusty_key" not in inventory:
+        return "use bronze_box", ()
+
+    exits = room["exits"]
+    least = min(visits[target] for target in exits.values())
+    return f"go {rng.choice([d for d, t in exits.items() if visits[t] == least])}", ()
+
+
+def scripted(game_state, rng, memory):
+    """Повторяет заранее найденный путь (ключ memory["path"]).
+
+    После конца пути отвечает заведомо неверно, чтобы эпизод не висел.
+    """
+    index = memory.get("index", 0)
+    memory["index"] = index + 1
+    path = memory["path"]
+    if index < len(path):
+        return path[index]
+    return "solve", (WRONG_ANSWER,)
+
+
+POLICIES = {
+    "random": random_walker,
+    "greedy": greedy_collector,
+    "optimal": scripted,
+}
+
+
+def optimal_path(max_depth=25):
+    """Находит кратчайший выигрышный путь при текущих константах.
+
+    Returns:
+        Список пар (команда, ответы) или None
+    """
+    return solve(max_depth=max_depth, full=False)["win_path"]
+
+
+class Tally:
+    """Потоковая сводка эпизодов: хранит счётчики, а не сами эпизоды.
+
+    Объём сводки зависит от максимального числа шагов, но не от числа
+    эпизодов, а сводки частей складываются через merge.
+
+    Attributes:
+        episodes: Число эпизодов
+        outcomes: Счётчик исходов ("win", "loss", "quit", "timeout")
+        causes: Счётчик пар (исход, причина)
+        steps: Счётчик значений steps_taken в конце эпизода
+        commands: Сумма выполненных команд
+    """
+
+    __slots__ = ("episodes", "outcomes", "causes", "steps", "commands")
+
+    def __init__(self):
+        self.episodes = 0
+        self.outcomes = Counter()
+        self.causes = Counter()
+        self.steps = Counter()
+        self.commands = 0
+
+    def add(self, game_state, commands_run):
+        outcome = game_state.outcome or TIMEOUT
+        self.episodes += 1
+        self.outcomes[outcome] += 1
+        self.causes[(outcome, game_state.cause)] += 1
+        self.steps[game_state.steps_taken] += 1
+        self.commands += commands_run
+
+    def merge(self, other):
+        self.episodes += other.episodes
+        self.outcomes.update(other.outcomes)
+        self.causes.update(other.causes)
+        self.steps.update(other.steps)
+        self.commands += other.commands
+        return self
+
+    def rate(self, outcome):
+        """Доля эпизодов с исходом outcome."""
+        return self.outcomes[outcome] / self.episodes if self.episodes else 0.0
+
+    def percentile(self, percent):
+        """Перцентиль числа шагов по гистограмме."""
+        if not self.episodes:
+            return None
+        threshold = self.episodes * percent / 100
+        running = 0
+        for value in sorted(self.steps):
+            running += self.steps[value]
+            if running >= threshold:
+                return value
+        return max(self.steps)
+
+    def mean_steps(self):
+        if not self.episodes:
+            return None
+        return sum(value * count for value, count in self.steps.items()) / self.episodes
+
+
+def _play(game_state, command, answers):
+    steps = process_command_steps(game_state, command)
+    try:
+        steps.send(None)
+        for answer in answers:
+            steps.send(answer)
+    except StopIteration:
+        return
+    steps.close()
+
+
+def run_episodes(policy, count, seed, params=None, overrides=None,
+                 max_commands=DEFAULT_MAX_COMMANDS, rng_key=None, first=0):
+    """Проигрывает count эпизодов политики в текущем процессе.
+
+    Args:
+        policy: Название политики из POLICIES
+        count: Число эпизодов
+        seed: Зерно генератора случайных чисел политики
+        params: Начальное содержимое памяти политики на эпизод
+        overrides: Подмена констант {имя: значение} или None
+        max_commands: Предел команд в эпизоде; дальше — исход timeout
+        rng_key: Ключ счётчикового генератора событий; эпизод с номером
+            i получает собственный поток CounterRandom(rng_key).spawn(i).
+            None — прежняя последовательность, общая для всех эпизодов
+        first: Номер первого эпизода
+
+    Returns:
+        Сводка эпизодов (Tally)
+    """
+    act = POLICIES[policy]
+    rng = random.Random(seed)
+    events = SIN_RNG if rng_key is None else CounterRandom(rng_key)
+    tally = Tally()
+    with override_constants(**(overrides or {})), use_sink(NullSink()):
+        for episode in range(first, first + count):
+            game_state = create_game_state(rng=events.spawn(episode))
+            memory = dict(params or {})
+            commands_run = 0
+            while not game_state.game_over and commands_run < max_commands:
+                command, answers = act(game_state, rng, memory)
+                _play(game_state, command, answers)
+                commands_run += 1
+            tally.add(game_state, commands_run)
+    return tally
+
+
+def _policy_params(policy, overrides):
+    if policy != "optimal":
+        return None
+    with override_constants(**(overrides or {})):
+        path = optimal_path()
+    if path is None:
+        raise ValueError("При этих константах выигрышный путь не найден")
+    return {"path": path}
+
+
+def evaluate(policy, episodes, overrides=None, seed=0,
+             max_commands=DEFAULT_MAX_COMMANDS, executor=None,
+             chunk_size=CHUNK_SIZE, rng_key=None):
+    """Оценивает политику на множестве эпизодов, параллельно при executor.
+
+    Эпизоды делятся на части по chunk_size; каждая часть получает своё
+    зерно, поэтому результат не зависит от числа процессов. Части
+    возвращают только сводки, которые сразу складываются.
+
+    Args:
+        policy: Название политики из POLICIES
+        episodes: Число эпизодов
+        overrides: Подмена констант {имя: значение} или None
+        seed: Базовое зерно
+        max_commands: Предел команд в эпизоде
+        executor: Пул процессов (concurrent.futures) или None
+        chunk_size: Эпизодов в одной части
+        rng_key: Ключ счётчикового генератора событий или None
+            (см. run_episodes)
+
+    Returns:
+        Сводка эпизодов (Tally)
+    """
+    params = _policy_params(policy, overrides)
+    chunks = [
+        (policy, min(chunk_size, episodes - start), (seed, start), params,
+         overrides, max_commands, rng_key)
+        for start in range(0, episodes, chunk_size)
+    ]
+    tally = Tally()
+    if executor is None:
+        for chunk in chunks:
+            tally.merge(_run_chunk(chunk))
+        return tally
+
+    from concurrent.futures import as_completed
+
+    for future in as_completed([executor.submit(_run_chunk, c) for c in chunks]):
+        tally.merge(future.result())
+    return tally
+
+
+def _run_chunk(chunk):
+    policy, count, (seed, start), params, overrides, max_commands, rng_key = chunk
+    return run_episodes(policy, count, (seed << 32) + start, params, overrides,
+                        max_commands, rng_key, start)
+
+
+def format_tally(tally):
+    """Переводит сводку в строки отчёта."""
+    lines = [f"эпизодов: {tally.episodes}, команд: {tally.commands}"]
+    for outcome in ("win", "loss", "quit", TIMEOUT):
+        if tally.outcomes[outcome]:
+            lines.append(f"  {outcome:<8} {tally.rate(outcome):8.2%}")
+    lines.append(
+        f"  шагов: среднее {tally.mean_steps():.1f}, p50 {tally.percentile(50)}, "
+        f"p90 {tally.percentile(90)}, p99 {tally.percentile(99)}"
+    )
+    for (outcome, cause), count in tally.causes.most_common():
+        if outcome == "loss":
+            lines.append(f"  причина поражения {cause}: {count / tally.episodes:.2%}")
+    return lines
+
+
+def _parse_assignment(text):
+    name, _, values = text.partition("=")
+    if name not in TUNABLE:
+        raise argparse.ArgumentTypeError(f"неизвестная константа {name}")
+    return name, [int(value) for value in values.split(",") if value]
+
+
+def main():
+    """Точка входа: оценивает политику и, по желанию, перебирает константу."""
+    parser = argparse.ArgumentParser(
+        description="Оценка политик игрока методом Монте-Карло",
+    )
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--episodes", type=int, default=100000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rng-seed", type=int,
+                        help="ключ генератора событий: у каждого эпизода "
+                             "свой поток")
+    parser.add_argument("--max-commands", type=int, default=DEFAULT_MAX_COMMANDS)
+    parser.add_argument("--set", type=_parse_assignment, action="append",
+                        default=[], metavar="NAME=VALUE",
+                        help="подменить константу")
+    parser.add_argument("--sweep", type=_parse_assignment, metavar="NAME=V1,V2,...",
+                        help="повторить оценку для каждого значения константы")
+    args = parser.parse_args()
+
+    overrides = {name: values[-1] for name, values in args.set}
+    runs = [dict(overrides)]
+    if args.sweep is not None:
+        name, values = args.sweep
+        runs = [dict(overrides, **{name: value}) for value in values]
+
+    executor = None
+    if args.processes > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(args.processes)
+    # Пул один на все прогоны: смена константы не перезапускает процессы
+    with executor or contextlib.nullcontext():
+        for run in runs:
+            tally = evaluate(args.policy, args.episodes, run, args.seed,
+                             args.max_commands, executor, rng_key=args.rng_seed)
+            title = ", ".join(f"{k}={v}" for k, v in run.items()) or "по умолчанию"
+            print(f"\n{args.policy}: {title}")
+            for line in format_tally(tally):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import contextlib
+import sys
+
+
+class BufferedSink:
+    """Приёмник вывода, который копит текст хода и пишет его одним вызовом.
+
+    Attributes:
+        stream: Поток для сброса буфера или None, если текст забирают
+            через take
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self):
+        """Возвращает накопленный текст и очищает буфер."""
+        text = "".join(self.parts)
+        self.parts.clear()
+        return text
+
+    def flush(self):
+        """Пишет накопленный текст в поток одним вызовом write."""
+        if self.parts and self.stream is not None:
+            self.stream.write(self.take())
+            self.stream.flush()
+
+
+class NullSink:
+    """Приёмник вывода, который отбрасывает весь текст."""
+
+    def write(self, text):
+        pass
+
+    def take(self):
+        return ""
+
+    def flush(self):
+        pass
+
+
+_sink = None
+
+
+def get_sink():
+    """Возвращает текущий приёмник вывода.
+
+    По умолчанию создаётся BufferedSink поверх sys.stdout на момент
+    первого вывода.
+    """
+    global _sink
+    if _sink is None:
+        _sink = BufferedSink(sys.stdout)
+    return _sink
+
+
+def set_sink(sink):
+    """Устанавливает приёмник вывода и возвращает предыдущий.
+
+    Args:
+        sink: Объект с методами write(text) и flush()
+
+    Returns:
+        Предыдущий приёмник (или None, если он ещё не создавался)
+    """
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+@contextlib.contextmanager
+def use_sink(sink):
+    """Временно направляет вывод игры в sink.
+
+    Args:
+        sink: Объект с методами write(text) и flush()
+    """
+    previous = set_sink(sink)
+    try:
+        yield sink
+    finally:
+        set_sink(previous)
+
+
+def say(text=""):
+    """Выводит строку текста игры (аналог print для одного аргумента).
+
+    Args:
+        text: Текст без завершающего перевода строки
+    """
+    (_sink or get_sink()).write(text + "\n")
+
+
+def flush_output():
+    """Сбрасывает накопленный за ход вывод в поток."""
+    if _sink is not None:
+        _sink.flush()
@@ -1,19 +1,31 @@
-from labyrinth_game.constants import ROOMS
-from labyrinth_game.utils import describe_current_room, random_event
+from labyrinth_game.constants import ITEM_LIFETIMES, ROOM_KEYS
+from labyrinth_game.output import say
+from labyrinth_game.routes import next_hop
+from labyrinth_game.utils import (
+    describe_current_room,
+    invalidate_room_view,
+    random_event,
+)
+from labyrinth_game.world import (
+    get_mutable_room,
+    get_room,
+    record_event,
+    schedule,
+)
 
 
 def show_inventory(game_state):
     """Выводит содержимое инвентаря игрока или сообщение об его пустоте.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
     """
-    if not game_state["player_inventory"]:
-        print("\nВаш инвентарь пуст.")
+    if not game_state.player_inventory:
+        say("\nВаш инвентарь пуст.")
     else:
-        print("\nВаш инвентарь:")
-        for item in game_state["player_inventory"]:
-            print(f"  - {item}")
+        say("\nВаш инвентарь:")
+        for item in game_state.player_inventory:
+            say(f"  - {item}")
 
 
 def get_input(prompt="> "):
@@ -28,47 +40,85 @@ def get_input(prompt="> "):
     try:
         return input(prompt).strip()
     except (KeyboardInterrupt, EOFError):
-        print("\nВыход из игры.")
+        say("\nВыход из игры.")
         return "quit"
 
 
-def move_player(game_state, direction):
+def move_player(game_state, direction, describe=True):
     """Перемещает игрока в указанном направлении при наличии выхода.
     
     Проверяет наличие выхода, обновляет текущую комнату, увеличивает
-    счётчик шагов и вызывает случайное событие после перемещения.
+    счётчик шагов и вызывает случайное событие после перемещения. Если
+    у сессии есть часы мира, шаг продвигает их, и случайное событие
+    срабатывает вместе с остальными запланированными.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
         direction: Направление перемещения (north/south/east/west)
+        describe: Выводить ли описание новой комнаты
     """
-    current_room = game_state["current_room"]
-    room = ROOMS[current_room]
+    current_room = game_state.current_room
+    room = get_room(game_state, current_room)
 
     if direction not in room["exits"]:
-        print("Нельзя пойти в этом направлении.")
+        say("Нельзя пойти в этом направлении.")
         return
 
     next_room = room["exits"][direction]
 
-    if next_room == "treasure_room":
-        if "rusty_key" in game_state["player_inventory"]:
-            print("Вы используете найденный ключ, чтобы открыть путь")
-            print("в комнату сокровищ.")
-            game_state["current_room"] = next_room
-            game_state["steps_taken"] += 1
-            print(f"\nВы пошли на {direction}.")
-            describe_current_room(game_state)
-            random_event(game_state)
-        else:
-            print("Дверь заперта. Нужен ключ, чтобы пройти дальше.")
+    key = ROOM_KEYS.get(next_room)
+    if key is not None:
+        if key not in game_state.player_inventory:
+            say("Дверь заперта. Нужен ключ, чтобы пройти дальше.")
+            return
+        say("Вы используете найденный ключ, чтобы открыть путь")
+        say("в комнату сокровищ.")
+
+    game_state.current_room = next_room
+    game_state.steps_taken += 1
+    record_event(game_state, "move", room=next_room, direction=direction)
+    say(f"\nВы пошли на {direction}.")
+    if describe:
+        describe_current_room(game_state)
+    if game_state.timers is None:
+        random_event(game_state)
+    else:
+        game_state.timers.advance(game_state.steps_taken, game_state)
+
+
+def travel(game_state, room_name):
+    """Ведёт игрока кратчайшим путём в указанную комнату одной командой.
+    
+    Каждый шаг — обычное перемещение со случайным событием; описание
+    выводится только для комнаты назначения. Путь выбирается заново
+    перед каждым шагом, поэтому учитывает ключи, потерянные по дороге.
+    
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты назначения
+    """
+    try:
+        direction = next_hop(game_state, room_name)
+    except KeyError:
+        say("Такой комнаты нет.")
+        return
+    if game_state.current_room == room_name:
+        say("Вы уже здесь.")
+        return
+    if direction is None:
+        say("Туда не пройти.")
         return
 
-    game_state["current_room"] = next_room
-    game_state["steps_taken"] += 1
-    print(f"\nВы пошли на {direction}.")
-    describe_current_room(game_state)
-    random_event(game_state)
+    while True:
+        current_room = game_state.current_room
+        last = game_state.world[current_room]["exits"][direction] == room_name
+        move_player(game_state, direction, describe=last)
+        if game_state.game_over or last or game_state.current_room == current_room:
+            return
+        direction = next_hop(game_state, room_name)
+        if direction is None:
+            say("Дальше пути нет.")
+            return
 
 
 def take_item(game_state, item_name):
@@ -77,59 +127,64 @@ def take_item(game_state, item_name):
     Блокирует поднятие сундука (treasure_chest) как слишком тяжёлого.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
         item_name: Название предмета для поднятия
     """
-    current_room = game_state["current_room"]
-    room = ROOMS[current_room]
+    current_room = game_state.current_room
+    room = get_room(game_state, current_room)
     
     if item_name == "treasure_chest":
-        print("Вы не можете поднять сундук, он слишком тяжелый.")
+        say("Вы не можете поднять сундук, он слишком тяжелый.")
         return
     
     if room["puzzle"] is not None and room["items"]:
         if item_name in room["items"]:
-            print(f"Предмет '{item_name}' охраняется загадкой.\
+            say(f"Предмет '{item_name}' охраняется загадкой.\
                  Сначала решите загадку (команда 'solve').")
             return
         else:
-            print("Такого предмета здесь нет.")
+            say("Такого предмета здесь нет.")
             return
     
     if item_name in room["items"]:
-        room["items"].remove(item_name)
-        game_state["player_inventory"].append(item_name)
-        print(f"Вы подняли: {item_name}")
+        get_mutable_room(game_state, current_room)["items"].remove(item_name)
+        invalidate_room_view(game_state, current_room)
+        game_state.player_inventory.add(item_name)
+        record_event(game_state, "take", item=item_name)
+        say(f"Вы подняли: {item_name}")
+        if item_name in ITEM_LIFETIMES:
+            schedule(game_state, ITEM_LIFETIMES[item_name], "wear_out", item_name)
     else:
-        print("Такого предмета здесь нет.")
+        say("Такого предмета здесь нет.")
 
 
 def use_item(game_state, item_name):
     """Использует предмет из инвентаря с уникальным эффектом для каждого.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
         item_name: Название предмета для использования
     """
-    if item_name not in game_state["player_inventory"]:
-        print("У вас нет такого предмета.")
+    if item_name not in game_state.player_inventory:
+        say("У вас нет такого предмета.")
         return
 
     if item_name == "torch":
-        print("Вы зажгли факел. Стало светлее, и вы лучше видите окружение.")
+        say("Вы зажгли факел. Стало светлее, и вы лучше видите окружение.")
     elif item_name == "sword":
-        print("Вы взяли меч в руки. Чувствуете себя увереннее.")
+        say("Вы взяли меч в руки. Чувствуете себя увереннее.")
     elif item_name == "bronze_box":
-        if "rusty_key" not in game_state["player_inventory"]:
-            game_state["player_inventory"].append("rusty_key")
-            print("Вы открыли бронзовую шкатулку. Внутри лежит ржавый ключ!")
+        if "rusty_key" not in game_state.player_inventory:
+            game_state.player_inventory.add("rusty_key")
+            record_event(game_state, "take", item="rusty_key")
+            say("Вы открыли бронзовую шкатулку. Внутри лежит ржавый ключ!")
         else:
-            print("Шкатулка уже пуста.")
+            say("Шкатулка уже пуста.")
     elif item_name == "ancient_book":
-        print("Вы пролистали древнюю книгу. На полях заметки о загадках")
-        print("лабиринта.")
+        say("Вы пролистали древнюю книгу. На полях заметки о загадках")
+        say("лабиринта.")
     elif item_name == "rusty_key":
-        print("Этот ключ выглядит хрупким. Возможно, он подойдёт к какой-то")
-        print("двери.")
+        say("Этот ключ выглядит хрупким. Возможно, он подойдёт к какой-то")
+        say("двери.")
     else:
-        print(f"Вы не знаете, как использовать {item_name}.")
\ No newline at end of file
+        say(f"Вы не знаете, как использовать {item_name}.")
@@ -0,0 +1,130 @@
+import functools
+import unicodedata
+
+from labyrinth_game.constants import ANSWER_ALIASES, PUZZLE_EFFECTS
+from labyrinth_game.output import say
+
+# Сколько скомпилированных загадок держать в памяти
+CACHE_SIZE = 4096
+
+_effects = {}
+
+
+def normalize_answer(text):
+    """Приводит ответ к канонической форме для сравнения.
+
+    Применяются нормализация Unicode NFKC, casefold и схлопывание
+    пробелов, так что "  Шаг  ШАГ шаг " и "шаг шаг шаг" совпадают.
+
+    Args:
+        text: Ответ игрока или эталонный ответ
+
+    Returns:
+        Нормализованная строка
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class Puzzle:
+    """Скомпилированная загадка комнаты.
+
+    Attributes:
+        question: Текст загадки
+        answer: Эталонный ответ (как в данных мира)
+        answers: Множество нормализованных верных ответов
+        on_success: Эффекты после верного ответа
+        on_failure: Эффекты после неверного ответа
+    """
+
+    __slots__ = ("question", "answer", "answers", "on_success", "on_failure")
+
+    def __init__(self, question, answer, aliases=(), on_success=(), on_failure=()):
+        self.question = question
+        self.answer = answer
+        self.answers = frozenset(
+            normalize_answer(variant) for variant in (answer, *aliases)
+        )
+        self.on_success = on_success
+        self.on_failure = on_failure
+
+    def matches(self, text):
+        """Проверяет ответ игрока одним поиском в множестве."""
+        return normalize_answer(text) in self.answers
+
+
+def _freeze(effects):
+    """Переводит эффекты из данных мира (списки JSON) в кортежи."""
+    if effects is None:
+        return None
+    return tuple(
+        (kind, tuple(tuple(effect) for effect in items))
+        for kind, items in sorted(effects.items())
+    )
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile(room_name, puzzle, effects):
+    question, answer = puzzle
+    if effects is None:
+        declared = PUZZLE_EFFECTS.get(room_name, {})
+    else:
+        declared = dict(effects)
+    return Puzzle(
+        question,
+        answer,
+        ANSWER_ALIASES.get(normalize_answer(answer), ()),
+        tuple(tuple(effect) for effect in declared.get("success", ())),
+        tuple(tuple(effect) for effect in declared.get("failure", ())),
+    )
+
+
+def get_puzzle(room_name, room):
+    """Возвращает скомпилированную загадку комнаты.
+
+    Эффекты берутся из ключа puzzle_effects комнаты, а если его нет —
+    из PUZZLE_EFFECTS по названию комнаты. Загадка компилируется один
+    раз и хранится в ограниченном кэше.
+
+    Args:
+        room_name: Название комнаты
+        room: Словарь комнаты с непустым ключом puzzle
+
+    Returns:
+        Загадка (Puzzle)
+    """
+    return _compile(room_name, room["puzzle"], _freeze(room.get("puzzle_effects")))
+
+
+def register_effect(name, handler):
+    """Регистрирует эффект, который можно объявить в данных загадки.
+
+    Args:
+        name: Название эффекта (первый элемент кортежа эффекта)
+        handler: Функция handler(game_state, room, *args), где room —
+            изменяемая комната сессии
+    """
+    _effects[name] = handler
+
+
+def run_effects(game_state, room, effects):
+    """Выполняет эффекты загадки по порядку.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room: Изменяемая комната сессии
+        effects: Кортеж эффектов (название, аргументы...)
+
+    Raises:
+        KeyError: Если эффект не зарегистрирован
+    """
+    for name, *args in effects:
+        _effects[name](game_state, room, *args)
+
+
+def _add_item(game_state, room, item):
+    if item not in room["items"]:
+        room["items"].append(item)
+
+
+register_effect("say", lambda game_state, room, text: say(text))
+register_effect("add_item", _add_item)
@@ -0,0 +1,368 @@
+import argparse
+import os
+import pickle
+from collections import OrderedDict
+
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import BufferedSink, use_sink
+from labyrinth_game.rng import SIN_RNG
+from labyrinth_game.world import copy_state, create_game_state
+
+# Сколько байт снимков состояния держать одновременно (оценка по
+# размеру pickle, см. snapshot_size)
+MAX_SNAPSHOT_BYTES = 64 * 1024 * 1024
+TRANSCRIPT_SUFFIX = ".txt"
+GOLDEN_SUFFIX = ".golden"
+# Сколько символов показывать вокруг расхождения
+CONTEXT = 80
+
+
+class _Node:
+    """Узел префиксного дерева сценариев: одна строка ввода.
+
+    Attributes:
+        parent: Родительский узел (None у корня)
+        line: Строка ввода
+        children: Дочерние узлы {строка: узел}
+        ends: Номера сценариев, которые заканчиваются здесь
+        chunk: Вывод игры на эту строку
+        command: Команда, к которой относится строка (сама строка или
+            команда, ждущая ответа)
+    """
+
+    __slots__ = ("parent", "line", "children", "ends", "chunk", "command")
+
+    def __init__(self, parent=None, line=None):
+        self.parent = parent
+        self.line = line
+        self.children = {}
+        self.ends = []
+        self.chunk = ""
+        self.command = None
+
+
+def snapshot_size(game_state):
+    """Оценивает объём снимка состояния в байтах.
+
+    Считается размер pickle той части состояния, которую копирует
+    copy_state: инвентаря, слоя изменённых комнат, событий, кэша
+    описаний и часов. Общий мир в снимок не входит.
+    """
+    return len(pickle.dumps((
+        game_state.player_inventory,
+        game_state.rooms,
+        game_state.events,
+        game_state.views,
+        game_state.timers,
+    ), pickle.HIGHEST_PROTOCOL))
+
+
+class SnapshotCache:
+    """Кэш снимков состояния в узлах ветвления, ограниченный по памяти.
+
+    Снимок большого мира может весить намного больше снимка маленького,
+    поэтому предел задаётся в байтах (см. snapshot_size), а не числом
+    снимков. При переполнении вытесняются снимки, которые дольше всех не
+    использовались; восстановление тогда начинается с ближайшего
+    сохранённого предка. Снимок больше всего предела не сохраняется.
+
+    Attributes:
+        max_bytes: Наибольший суммарный объём снимков
+        size: Текущий суммарный объём снимков
+        evictions: Число вытесненных снимков
+        peak: Наибольшее число снимков, хранившихся одновременно
+        peak_bytes: Наибольший суммарный объём снимков
+    """
+
+    __slots__ = ("max_bytes", "size", "evictions", "peak", "peak_bytes", "_entries")
+
+    def __init__(self, max_bytes=MAX_SNAPSHOT_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self.peak = 0
+        self.peak_bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, node):
+        entry = self._entries.get(node)
+        if entry is None:
+            return None
+        self._entries.move_to_end(node)
+        return entry[0]
+
+    def put(self, node, game_state):
+        size = snapshot_size(game_state)
+        if size > self.max_bytes:
+            return
+        self.discard(node)
+        while self.size + size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+        self._entries[node] = (copy_state(game_state), size)
+        self.size += size
+        self.peak = max(self.peak, len(self._entries))
+        self.peak_bytes = max(self.peak_bytes, self.size)
+
+    def discard(self, node):
+        entry = self._entries.pop(node, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+def build_trie(transcripts):
+    """Складывает сценарии в префиксное дерево по строкам ввода.
+
+    Args:
+        transcripts: Последовательность списков строк ввода
+
+    Returns:
+        Корень дерева (_Node)
+    """
+    root = _Node()
+    for index, lines in enumerate(transcripts):
+        node = root
+        for line in lines:
+            child = node.children.get(line)
+            if child is None:
+                child = node.children[line] = _Node(node, line)
+            node = child
+        node.ends.append(index)
+    return root
+
+
+def _feed(game_state, steps, line):
+    """Подаёт одну строку ввода так же, как script.run_lines.
+
+    Returns:
+        Пару (генератор команды, ждущей ответа, или None, начата ли
+        этой строкой новая команда)
+    """
+    if steps is None:
+        if game_state.game_over:
+            return None, False
+        steps = process_command_steps(game_state, line)
+        line = None
+        started = True
+    else:
+        started = False
+    try:
+        steps.send(line)
+    except StopIteration:
+        steps = None
+    return steps, started
+
+
+def _path(node, stop=None):
+    """Возвращает узлы от потомка stop до node включительно."""
+    nodes = []
+    while node is not stop:
+        nodes.append(node)
+        node = node.parent
+    nodes.reverse()
+    return nodes
+
+
+class Replay:
+    """Проигрывание множества сценариев с общими префиксами.
+
+    Сценарии обходятся в глубину по префиксному дереву, так что каждая
+    общая часть выполняется один раз. В узлах ветвления сохраняется
+    снимок состояния, с которого продолжается следующая ветвь. Снимок
+    возможен только между командами: если в узле ветвления команда ждёт
+    ответа, ветвь восстанавливается от ближайшего снимка выше.
+
+    Attributes:
+        world: Словарь комнат
+        rng: Генератор случайных событий сценариев
+        cache: Кэш снимков (SnapshotCache)
+        executed: Число выполненных строк, включая повторные
+    """
+
+    def __init__(self, world=ROOMS, rng=SIN_RNG,
+                 max_snapshot_bytes=MAX_SNAPSHOT_BYTES):
+        self.world = world
+        self.rng = rng
+        self.cache = SnapshotCache(max_snapshot_bytes)
+        self.executed = 0
+        self._output = BufferedSink()
+
+    def run(self, transcripts):
+        """Проигрывает сценарии и собирает вывод каждого.
+
+        Args:
+            transcripts: Последовательность списков строк ввода
+
+        Returns:
+            Список результатов по порядку сценариев: словари с ключами
+            output (текст игры) и lines (узлы строк сценария)
+        """
+        root = build_trie(transcripts)
+        results = [None] * len(transcripts)
+        for index in root.ends:
+            results[index] = {"output": "", "lines": []}
+
+        game_state, steps, live = None, None, None
+        stack = [(child, False) for child in reversed(root.children.values())]
+        with use_sink(self._output):
+            while stack:
+                node, leaving = stack.pop()
+                if leaving:
+                    self.cache.discard(node)
+                    continue
+
+                if live is not node.parent:
+                    game_state, steps = self._restore(root, node.parent)
+                steps, started = _feed(game_state, steps, node.line)
+                self.executed += 1
+                node.chunk = self._output.take()
+                node.command = node.line if started else node.parent.command
+                live = node
+
+                for index in node.ends:
+                    lines = _path(node, root)
+                    results[index] = {
+                        "output": "".join(line.chunk for line in lines),
+                        "lines": lines,
+                    }
+
+                if len(node.children) > 1:
+                    if steps is None:
+                        self.cache.put(node, game_state)
+                    stack.append((node, True))
+                stack.extend(
+                    (child, False) for child in reversed(node.children.values())
+                )
+        return results
+
+    def _restore(self, root, target):
+        """Восстанавливает состояние после строки target.
+
+        Returns:
+            Пару (состояние игры, генератор команды, ждущей ответа, или None)
+        """
+        base = target
+        snapshot = None
+        while base is not root:
+            snapshot = self.cache.get(base)
+            if snapshot is not None:
+                break
+            base = base.parent
+
+        if snapshot is None:
+            game_state = create_game_state(self.world, self.rng)
+        else:
+            game_state = copy_state(snapshot)
+        steps = None
+        for node in _path(target, base):
+            steps, _ = _feed(game_state, steps, node.line)
+            self.executed += 1
+        self._output.take()
+        return game_state, steps
+
+
+def first_divergence(result, golden):
+    """Находит первую строку сценария, вывод которой расходится с эталоном.
+
+    Args:
+        result: Результат сценария из Replay.run
+        golden: Эталонный текст вывода
+
+    Returns:
+        None, если вывод совпал, иначе словарь с ключами line (номер
+        строки с 1 или 0, если сценарий пуст), input, command, expected
+        и actual (фрагменты с места расхождения)
+    """
+    output = result["output"]
+    if output == golden:
+        return None
+    offset = len(os.path.commonprefix([output, golden]))
+
+    position = 0
+    number, node = 0, None
+    for number, node in enumerate(result["lines"], 1):
+        position += len(node.chunk)
+        if position > offset:
+            break
+    return {
+        "line": number,
+        "input": node.line if node is not None else None,
+        "command": node.command if node is not None else None,
+        "expected": golden[offset:offset + CONTEXT],
+        "actual": output[offset:offset + CONTEXT],
+    }
+
+
+def load_transcripts(directory):
+    """Читает сценарии NAME.txt из каталога (формат labyrinth_game.script).
+
+    Returns:
+        Список пар (путь без расширения, список строк ввода) по имени
+    """
+    entries = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(TRANSCRIPT_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8", errors="replace") as stream:
+            lines = [line.strip() for line in stream]
+        entries.append((path[:-len(TRANSCRIPT_SUFFIX)], lines))
+    return entries
+
+
+def main():
+    """Точка входа: сверяет вывод сценариев каталога с эталонами.
+
+    Код возврата 1 означает расхождение или отсутствующий эталон.
+    """
+    parser = argparse.ArgumentParser(
+        description="Проверка записанных сценариев Лабиринта сокровищ",
+    )
+    parser.add_argument("directory",
+                        help="каталог со сценариями NAME.txt и эталонами "
+                             "NAME.golden")
+    parser.add_argument("--update", action="store_true",
+                        help="записать текущий вывод как эталонный")
+    parser.add_argument("--snapshot-memory", type=float, metavar="MB",
+                        default=MAX_SNAPSHOT_BYTES / 2**20,
+                        help="сколько мегабайт снимков состояния держать")
+    args = parser.parse_args()
+
+    entries = load_transcripts(args.directory)
+    replay = Replay(max_snapshot_bytes=int(args.snapshot_memory * 2**20))
+    results = replay.run([lines for _, lines in entries])
+
+    failures = 0
+    for (base, _), result in zip(entries, results):
+        golden_path = base + GOLDEN_SUFFIX
+        if args.update:
+            with open(golden_path, "w", encoding="utf-8", newline="") as stream:
+                stream.write(result["output"])
+            continue
+        if not os.path.exists(golden_path):
+            failures += 1
+            print(f"{base}: нет эталона {golden_path}")
+            continue
+        with open(golden_path, encoding="utf-8", newline="") as stream:
+            diff = first_divergence(result, stream.read())
+        if diff is None:
+            continue
+        failures += 1
+        print(f"{base}: расхождение в строке {diff['line']} "
+              f"({diff['input']!r}, команда {diff['command']!r})")
+        print(f"  ожидалось: {diff['expected']!r}")
+        print(f"  получено:  {diff['actual']!r}")
+
+    total = sum(len(lines) for _, lines in entries)
+    print(f"Сценариев: {len(entries)}, расхождений: {failures}")
+    print(f"Строк в сценариях: {total}, выполнено: {replay.executed}, "
+          f"снимков: до {replay.cache.peak} "
+          f"({replay.cache.peak_bytes / 1024:.0f} КиБ), "
+          f"вытеснено: {replay.cache.evictions}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
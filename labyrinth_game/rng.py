@@ -0,0 +1,171 @@
+import math
+
+_MASK = (1 << 64) - 1
+_GAMMA = 0x9E3779B97F4A7C15        # шаг счётчика SplitMix64
+_LANE_GAMMA = 0xD1B54A32D192ED03   # разводит потоки одного ключа
+
+# Потоки (lanes) случайных значений, которые игра берёт на одном шаге
+LANE_EVENT = 0        # случится ли событие после перемещения
+LANE_EVENT_TYPE = 1   # тип события
+LANE_TRAP_ITEM = 2    # какой предмет заберёт ловушка
+LANE_TRAP_DAMAGE = 3  # бросок урона ловушки при пустом инвентаре
+
+
+def pseudo_random(seed, modulo):
+    """Генерирует псевдослучайное число на основе синуса.
+
+    Args:
+        seed: Зерно (обычно шаги игрока)
+        modulo: Верхняя граница результата [0, modulo)
+
+    Returns:
+        Целое число в диапазоне [0, modulo)
+    """
+    value = math.sin(seed * 12.9898) * 43758.5453
+    fractional = value - math.floor(value)
+    result = fractional * modulo
+    return int(math.floor(result))
+
+
+def _mix(value):
+    """Финализатор SplitMix64: перемешивает 64-битное целое."""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+class SinRandom:
+    """Режим совместимости: прежняя последовательность pseudo_random.
+
+    Значение зависит только от счётчика (числа шагов): потоки не
+    различаются, и все сессии с одинаковым числом шагов получают одни
+    и те же события.
+    """
+
+    __slots__ = ()
+
+    def randint(self, counter, modulo, lane=LANE_EVENT):
+        """Возвращает целое из [0, modulo) для позиции counter."""
+        return pseudo_random(counter, modulo)
+
+    def block(self, start, count, modulo, lane=LANE_EVENT):
+        """Возвращает значения randint для позиций [start, start + count)."""
+        return [
+            pseudo_random(counter, modulo)
+            for counter in range(start, start + count)
+        ]
+
+    def spawn(self, index):
+        """Совместимый режим не имеет независимых потоков."""
+        return self
+
+    def spec(self):
+        return "sin"
+
+    def __reduce__(self):
+        # Распаковка возвращает общий экземпляр SIN_RNG
+        return "SIN_RNG"
+
+    def __repr__(self):
+        return "SinRandom()"
+
+
+class CounterRandom:
+    """Счётчиковый генератор: значение — хэш ключа, потока и позиции.
+
+    Состояния у генератора нет, поэтому любая позиция вычисляется
+    напрямую (переход вперёд бесплатен), значения можно получать
+    блоками, а параллельные процессы не делят никаких данных. Сессии
+    с разными ключами получают независимые последовательности.
+
+    Attributes:
+        key: 64-битный ключ потока
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key & _MASK
+
+    def bits(self, counter, lane=LANE_EVENT):
+        """Возвращает 64 случайных бита для позиции counter потока lane."""
+        base = self.key ^ ((lane * _LANE_GAMMA) & _MASK)
+        return _mix((base + (counter + 1) * _GAMMA) & _MASK)
+
+    def randint(self, counter, modulo, lane=LANE_EVENT):
+        """Возвращает целое из [0, modulo) для позиции counter."""
+        return (self.bits(counter, lane) * modulo) >> 64
+
+    def block(self, start, count, modulo, lane=LANE_EVENT):
+        """Возвращает значения randint для позиций [start, start + count)."""
+        base = self.key ^ ((lane * _LANE_GAMMA) & _MASK)
+        value = (base + start * _GAMMA) & _MASK
+        result = []
+        for _ in range(count):
+            value = (value + _GAMMA) & _MASK
+            result.append((_mix(value) * modulo) >> 64)
+        return result
+
+    def spawn(self, index):
+        """Возвращает независимый генератор для сессии или эпизода index."""
+        return CounterRandom(_mix((self.key + (index + 1) * _LANE_GAMMA) & _MASK))
+
+    def spec(self):
+        return f"counter:{self.key}"
+
+    def __eq__(self, other):
+        return isinstance(other, CounterRandom) and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"CounterRandom({self.key})"
+
+
+class Stream:
+    """Последовательное чтение генератора с текущей позицией.
+
+    Attributes:
+        rng: Генератор (SinRandom или CounterRandom)
+        lane: Поток генератора
+        position: Позиция следующего значения
+    """
+
+    __slots__ = ("rng", "lane", "position")
+
+    def __init__(self, rng, lane=LANE_EVENT, position=0):
+        self.rng = rng
+        self.lane = lane
+        self.position = position
+
+    def randint(self, modulo):
+        value = self.rng.randint(self.position, modulo, self.lane)
+        self.position += 1
+        return value
+
+    def block(self, count, modulo):
+        values = self.rng.block(self.position, count, modulo, self.lane)
+        self.position += count
+        return values
+
+    def jump(self, count):
+        """Пропускает count значений за O(1)."""
+        self.position += count
+
+
+SIN_RNG = SinRandom()
+
+
+def from_spec(spec):
+    """Восстанавливает генератор по строке spec() (например, из сохранения).
+
+    Raises:
+        ValueError: Если строка не описывает известный генератор
+    """
+    if spec == "sin":
+        return SIN_RNG
+    kind, _, key = spec.partition(":")
+    if kind == "counter" and key.isdigit():
+        return CounterRandom(int(key))
+    raise ValueError(f"Неизвестный генератор случайных чисел: {spec!r}")
@@ -0,0 +1,327 @@
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+from labyrinth_game.constants import ROOM_KEYS
+from labyrinth_game.graph import DIRECTIONS, NO_EXIT, get_graph
+
+# Сколько байт таблиц маршрутов (комната назначения + набор открытых
+# дверей) держать в памяти; таблица занимает 8 байт на комнату мира
+CACHE_BYTES = 64 * 1024 * 1024
+UNREACHABLE = -1
+
+_tables = OrderedDict()
+_cached_bytes = 0
+_maps = {}
+# Таблицы могут строиться в пуле потоков (см. server), а кэши общие
+_lock = threading.Lock()
+_maps_lock = threading.Lock()
+
+
+class RouteMap:
+    """Выходы мира, по которым ищутся маршруты.
+
+    Таблица смежности та же, что у graph.WorldGraph, но для мира из файла
+    (worldfile.LazyWorld) она читается прямо из записей, без разбора
+    комнат и без компиляции всего мира.
+
+    Attributes:
+        room_count: Число комнат
+        directions: Названия направлений по их идентификаторам
+        exits: Таблица смежности array('i')
+        room_id: Функция room_id(название) -> идентификатор или None
+        predecessors: Обратные рёбра (starts, sources, directions):
+            выходы, ведущие в комнату room, лежат в
+            sources[starts[room]:starts[room + 1]]
+        locks: Запертые комнаты {идентификатор: ключ}
+    """
+
+    __slots__ = (
+        "room_count",
+        "directions",
+        "exits",
+        "room_id",
+        "predecessors",
+        "locks",
+    )
+
+    def __init__(self, room_count, directions, exits, room_id):
+        self.room_count = room_count
+        self.directions = directions
+        self.exits = exits
+        self.room_id = room_id
+        self.predecessors = _reverse_edges(room_count, len(directions), exits)
+        self.locks = {}
+        for room_name, key in ROOM_KEYS.items():
+            room = room_id(room_name)
+            if room is not None:
+                self.locks[room] = key
+
+    def exit(self, room_id, direction_id):
+        """Возвращает комнату за выходом или NO_EXIT."""
+        return self.exits[room_id * len(self.directions) + direction_id]
+
+    def require(self, room_name):
+        """Возвращает идентификатор комнаты.
+
+        Raises:
+            KeyError: Если такой комнаты нет
+        """
+        room = self.room_id(room_name)
+        if room is None:
+            raise KeyError(room_name)
+        return room
+
+
+class RouteTable:
+    """Кратчайшие пути в одну комнату из всех остальных.
+
+    Attributes:
+        target: Идентификатор комнаты назначения
+        opened: Запертые комнаты, двери которых открыты (frozenset
+            идентификаторов)
+        distances: Число шагов до цели по комнатам или UNREACHABLE
+        hops: Идентификатор направления первого шага или NO_EXIT
+    """
+
+    __slots__ = ("target", "opened", "distances", "hops")
+
+    def __init__(self, target, opened, distances, hops):
+        self.target = target
+        self.opened = opened
+        self.distances = distances
+        self.hops = hops
+
+
+def _reverse_edges(room_count, width, exits):
+    """Строит обратные рёбра плоско, сортировкой подсчётом по комнатам."""
+    starts = array("i", [0]) * (room_count + 1)
+    for target in exits:
+        if target != NO_EXIT:
+            starts[target + 1] += 1
+    for room in range(room_count):
+        starts[room + 1] += starts[room]
+
+    fill = array("i", starts)
+    sources = array("i", [0]) * starts[room_count]
+    directions = array("i", [0]) * starts[room_count]
+    for index, target in enumerate(exits):
+        if target != NO_EXIT:
+            position = fill[target]
+            fill[target] = position + 1
+            sources[position], directions[position] = divmod(index, width)
+    return starts, sources, directions
+
+
+def get_route_map(world):
+    """Возвращает выходы мира для поиска маршрутов, строя их один раз.
+
+    Мир, который умеет сам строить таблицу смежности (exit_table, как
+    worldfile.LazyWorld), не компилируется целиком; для словаря комнат
+    используется общий граф graph.get_graph.
+
+    Args:
+        world: Словарь комнат или LazyWorld
+
+    Returns:
+        Выходы мира (RouteMap)
+    """
+    with _maps_lock:
+        entry = _maps.get(id(world))
+        if entry is not None and entry[0] is world:
+            return entry[1]
+
+        exit_table = getattr(world, "exit_table", None)
+        if exit_table is None:
+            graph = get_graph(world)
+            route_map = RouteMap(
+                len(graph.room_names), graph.directions, graph.exits,
+                graph.room_ids.get,
+            )
+        else:
+            directions, exits = exit_table(DIRECTIONS)
+            route_map = RouteMap(len(world), directions, exits, world.room_id)
+        _maps[id(world)] = (world, route_map)
+        return route_map
+
+
+def opened_rooms(route_map, inventory):
+    """Возвращает запертые комнаты, ключи от которых есть в инвентаре."""
+    return frozenset(
+        room for room, key in route_map.locks.items() if key in inventory
+    )
+
+
+def _relax(queue, table, predecessors, locks):
+    """Распространяет расстояния от комнат очереди к их соседям.
+
+    Очередь обрабатывается до исчерпания, а расстояние комнаты может
+    уменьшаться повторно, поэтому результат верен и при старте с
+    частично готовой таблицы.
+    """
+    starts, sources, directions = predecessors
+    distances, hops, opened = table.distances, table.hops, table.opened
+    while queue:
+        room = queue.popleft()
+        if room in locks and room not in opened:
+            continue
+        distance = distances[room] + 1
+        for index in range(starts[room], starts[room + 1]):
+            source = sources[index]
+            known = distances[source]
+            if known == UNREACHABLE or distance < known:
+                distances[source] = distance
+                hops[source] = directions[index]
+                queue.append(source)
+
+
+def _build(route_map, target, opened):
+    """Строит таблицу маршрутов, по возможности дополняя готовую.
+
+    Открытая дверь только добавляет рёбра, поэтому таблицу для меньшего
+    набора открытых дверей можно скопировать и распространить от вновь
+    открытых комнат, а не строить заново.
+    """
+    base = None
+    with _lock:
+        for (other, room, doors), table in _tables.items():
+            if other is route_map and room == target and doors < opened:
+                if base is None or len(doors) > len(base.opened):
+                    base = table
+
+    if base is None:
+        room_count = route_map.room_count
+        table = RouteTable(
+            target,
+            opened,
+            array("i", [UNREACHABLE]) * room_count,
+            array("i", [NO_EXIT]) * room_count,
+        )
+        table.distances[target] = 0
+        queue = deque([target])
+    else:
+        table = RouteTable(
+            target, opened, array("i", base.distances), array("i", base.hops),
+        )
+        queue = deque(
+            room for room in opened - base.opened
+            if table.distances[room] != UNREACHABLE
+        )
+    _relax(queue, table, route_map.predecessors, route_map.locks)
+    return table
+
+
+def _table_bytes(table):
+    return (
+        table.distances.itemsize * len(table.distances)
+        + table.hops.itemsize * len(table.hops)
+    )
+
+
+def route_table(route_map, target, opened):
+    """Возвращает таблицу маршрутов в комнату target, используя кэш.
+
+    Кэш ограничен объёмом таблиц (CACHE_BYTES), а не их числом: в
+    большом мире одна таблица весит мегабайты. Последняя построенная
+    таблица остаётся в кэше, даже если одна превышает предел.
+
+    Args:
+        route_map: Выходы мира (RouteMap, см. get_route_map)
+        target: Идентификатор комнаты назначения
+        opened: Открытые запертые комнаты (см. opened_rooms)
+
+    Returns:
+        Таблица маршрутов (RouteTable)
+    """
+    global _cached_bytes
+    key = (route_map, target, opened)
+    with _lock:
+        table = _tables.get(key)
+        if table is not None:
+            _tables.move_to_end(key)
+            return table
+
+    # Строится без блокировки: другие потоки тем временем читают кэш
+    table = _build(route_map, target, opened)
+    with _lock:
+        if key in _tables:
+            return _tables[key]
+        _tables[key] = table
+        _cached_bytes += _table_bytes(table)
+        while _cached_bytes > CACHE_BYTES and len(_tables) > 1:
+            _, evicted = _tables.popitem(last=False)
+            _cached_bytes -= _table_bytes(evicted)
+    return table
+
+
+def _table_for(game_state, room_name):
+    route_map = get_route_map(game_state.world)
+    target = route_map.require(room_name)
+    opened = opened_rooms(route_map, game_state.player_inventory)
+    return route_map, route_table(route_map, target, opened)
+
+
+def prepare_route(game_state, room_name):
+    """Заранее строит таблицу маршрутов к комнате room_name.
+
+    Построение для нового назначения занимает заметное время в большом
+    мире, поэтому сервер вызывает эту функцию в пуле потоков, а сама
+    команда travel затем берёт таблицу из кэша. Неизвестная комната
+    пропускается: о ней сообщит travel.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты назначения
+    """
+    try:
+        _table_for(game_state, room_name)
+    except KeyError:
+        pass
+
+
+def next_hop(game_state, room_name):
+    """Возвращает направление первого шага к комнате room_name.
+
+    Учитываются запертые комнаты (ROOM_KEYS): дверь считается открытой,
+    если ключ есть в инвентаре.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты назначения
+
+    Returns:
+        Название направления или None, если игрок уже там или комната
+        недостижима
+
+    Raises:
+        KeyError: Если такой комнаты нет
+    """
+    route_map, table = _table_for(game_state, room_name)
+    direction_id = table.hops[route_map.require(game_state.current_room)]
+    return None if direction_id == NO_EXIT else route_map.directions[direction_id]
+
+
+def find_route(game_state, room_name):
+    """Возвращает кратчайший путь к комнате room_name.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты назначения
+
+    Returns:
+        Список направлений (пустой, если игрок уже там) или None, если
+        комната недостижима
+
+    Raises:
+        KeyError: Если такой комнаты нет
+    """
+    route_map, table = _table_for(game_state, room_name)
+    room = route_map.require(game_state.current_room)
+    if table.distances[room] == UNREACHABLE:
+        return None
+    route = []
+    while room != table.target:
+        direction_id = table.hops[room]
+        route.append(route_map.directions[direction_id])
+        room = route_map.exit(room, direction_id)
+    return route
@@ -0,0 +1,354 @@
+import mmap
+import os
+import struct
+import zlib
+
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.fileio import write_atomic
+from labyrinth_game.inventory import Inventory
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import NullSink, use_sink
+from labyrinth_game.rng import SIN_RNG, from_spec
+from labyrinth_game.scheduler import Scheduler
+from labyrinth_game.world import create_game_state
+
+MAGIC = b"LBSV"
+VERSION = 4
+# Версии снимков, которые ещё читаются (в версии 1 нет генератора,
+# до версии 3 инвентарь хранился списком без стопок, до версии 4 не
+# было часов мира)
+READABLE_VERSIONS = (1, 2, 3, 4)
+
+_HEADER = struct.Struct("<4sHQ")      # сигнатура, версия, смещение в журнале
+_STATE = struct.Struct("<Q?")         # steps_taken, game_over
+_ROOM = struct.Struct("<?H")          # загадка решена, puzzle_attempts
+_CLOCK = struct.Struct("<?QI")        # есть часы, текущий тик, число событий
+_TIMER = struct.Struct("<QI")         # тик срабатывания, период
+_COUNT = struct.Struct("<H")
+_STRING = struct.Struct("<H")
+_RECORD = struct.Struct("<II")        # длина записи журнала, CRC32
+
+
+def _put_str(out, text):
+    data = text.encode("utf-8")
+    out += _STRING.pack(len(data))
+    out += data
+
+
+def _put_strs(out, texts):
+    out += _COUNT.pack(len(texts))
+    for text in texts:
+        _put_str(out, text)
+
+
+def _put_counts(out, inventory):
+    out += _COUNT.pack(inventory.slot_count())
+    for item, count in inventory.items():
+        _put_str(out, item)
+        out += _COUNT.pack(count)
+
+
+def _get_counts(buffer, offset):
+    (slots,) = _COUNT.unpack_from(buffer, offset)
+    offset += _COUNT.size
+    pairs = []
+    for _ in range(slots):
+        item, offset = _get_str(buffer, offset)
+        (count,) = _COUNT.unpack_from(buffer, offset)
+        offset += _COUNT.size
+        pairs.append((item, count))
+    return Inventory.from_counts(pairs), offset
+
+
+def _put_timers(out, timers):
+    if timers is None:
+        out += _CLOCK.pack(False, 0, 0)
+        return
+    pending = timers.pending()
+    out += _CLOCK.pack(True, timers.now, len(pending))
+    for timer in pending:
+        out += _TIMER.pack(timer.deadline, timer.period)
+        _put_str(out, timer.name)
+        _put_strs(out, timer.args)
+
+
+def _get_timers(buffer, offset):
+    enabled, now, count = _CLOCK.unpack_from(buffer, offset)
+    offset += _CLOCK.size
+    if not enabled:
+        return None, offset
+    timers = Scheduler(now)
+    for _ in range(count):
+        deadline, period = _TIMER.unpack_from(buffer, offset)
+        offset += _TIMER.size
+        name, offset = _get_str(buffer, offset)
+        args, offset = _get_strs(buffer, offset)
+        timers.schedule(deadline - now, name, *args, period=period)
+    return timers, offset
+
+
+def _get_str(buffer, offset):
+    (size,) = _STRING.unpack_from(buffer, offset)
+    offset += _STRING.size
+    return bytes(buffer[offset:offset + size]).decode("utf-8"), offset + size
+
+
+def _get_strs(buffer, offset):
+    (count,) = _COUNT.unpack_from(buffer, offset)
+    offset += _COUNT.size
+    texts = []
+    for _ in range(count):
+        text, offset = _get_str(buffer, offset)
+        texts.append(text)
+    return texts, offset
+
+
+def encode_state(game_state, journal_offset=0):
+    """Кодирует состояние игры в компактный двоичный снимок.
+
+    Сохраняются только данные сессии: комната, шаги, исход, генератор
+    случайных событий, инвентарь, слой изменённых комнат и события часов
+    мира. Общие данные мира в снимок не входят.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        journal_offset: Смещение в журнале, до которого снимок актуален
+
+    Returns:
+        Байты снимка
+    """
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, journal_offset))
+    _put_str(out, game_state.current_room)
+    out += _STATE.pack(game_state.steps_taken, game_state.game_over)
+    _put_str(out, game_state.outcome or "")
+    _put_str(out, game_state.cause or "")
+    _put_str(out, game_state.rng.spec())
+    _put_counts(out, game_state.player_inventory)
+
+    out += _COUNT.pack(len(game_state.rooms))
+    for name, room in game_state.rooms.items():
+        _put_str(out, name)
+        _put_strs(out, room["items"])
+        out += _ROOM.pack(room["puzzle"] is None, room.get("puzzle_attempts", 0))
+    _put_timers(out, game_state.timers)
+    return bytes(out)
+
+
+def decode_state(buffer, world=ROOMS):
+    """Восстанавливает состояние игры из двоичного снимка.
+
+    Args:
+        buffer: Байты снимка или отображение файла в память
+        world: Словарь комнат, поверх которого строится слой изменений
+
+    Returns:
+        Пара (состояние игры, смещение в журнале)
+
+    Raises:
+        ValueError: Если данные не являются снимком поддерживаемой версии
+    """
+    magic, version, journal_offset = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version not in READABLE_VERSIONS:
+        raise ValueError("Файл не является снимком сохранения этой версии")
+    offset = _HEADER.size
+
+    game_state = create_game_state(world)
+    game_state.current_room, offset = _get_str(buffer, offset)
+    game_state.steps_taken, game_state.game_over = _STATE.unpack_from(buffer, offset)
+    offset += _STATE.size
+    outcome, offset = _get_str(buffer, offset)
+    cause, offset = _get_str(buffer, offset)
+    game_state.outcome = outcome or None
+    game_state.cause = cause or None
+    game_state.rng = SIN_RNG
+    if version >= 2:
+        spec, offset = _get_str(buffer, offset)
+        game_state.rng = from_spec(spec)
+    if version >= 3:
+        game_state.player_inventory, offset = _get_counts(buffer, offset)
+    else:
+        items, offset = _get_strs(buffer, offset)
+        game_state.player_inventory = Inventory(items)
+
+    (count,) = _COUNT.unpack_from(buffer, offset)
+    offset += _COUNT.size
+    for _ in range(count):
+        name, offset = _get_str(buffer, offset)
+        items, offset = _get_strs(buffer, offset)
+        solved, attempts = _ROOM.unpack_from(buffer, offset)
+        offset += _ROOM.size
+
+        room = dict(world[name], items=items, puzzle_attempts=attempts)
+        if solved:
+            room["puzzle"] = None
+        game_state.rooms[name] = room
+    if version >= 4:
+        game_state.timers, offset = _get_timers(buffer, offset)
+    return game_state, journal_offset
+
+
+def encode_record(command, answers=()):
+    """Кодирует ход (команду и ответы на её запросы) в запись журнала."""
+    payload = bytearray()
+    _put_strs(payload, [command, *answers])
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_journal(path, offset=0):
+    """Читает записи журнала, начиная со смещения.
+
+    Чтение останавливается на первой оборванной или повреждённой записи:
+    так выглядит хвост журнала после аварийного завершения.
+
+    Args:
+        path: Путь к файлу журнала
+        offset: Смещение первой записи
+
+    Yields:
+        Тройки (команда, список ответов, смещение после записи)
+    """
+    if not os.path.exists(path) or os.path.getsize(path) <= offset:
+        return
+    with open(path, "rb") as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        end = len(buffer)
+        while offset + _RECORD.size <= end:
+            size, checksum = _RECORD.unpack_from(buffer, offset)
+            start = offset + _RECORD.size
+            payload = buffer[start:start + size]
+            if len(payload) < size or zlib.crc32(payload) != checksum:
+                return
+            (command, *answers), _ = _get_strs(payload, 0)
+            offset = start + size
+            yield command, answers, offset
+
+
+def replay_turn(game_state, command, answers):
+    """Повторяет записанный ход без вывода на экран.
+
+    Args:
+        game_state: Состояние игры (GameState), изменяется на месте
+        command: Строка команды
+        answers: Ответы на запросы команды
+    """
+    steps = process_command_steps(game_state, command)
+    with use_sink(NullSink()):
+        try:
+            steps.send(None)
+            for answer in answers:
+                steps.send(answer)
+        except StopIteration:
+            return
+        steps.close()
+
+
+class SaveSlot:
+    """Сохранение одной сессии: двоичный снимок и журнал ходов рядом с ним.
+
+    Каждый ход дописывается в журнал сразу после выполнения, поэтому
+    сохранение не переписывает состояние целиком. Снимок (checkpoint)
+    делается время от времени и запоминает, до какого места журнала он
+    актуален; при загрузке повторяется только хвост журнала.
+
+    Attributes:
+        snapshot_path: Путь к файлу снимка
+        journal_path: Путь к файлу журнала
+        world: Словарь комнат сессии
+        rng: Генератор случайных событий для новой игры
+        timers: Заводить ли новой игре часы мира
+    """
+
+    def __init__(self, path, world=ROOMS, rng=SIN_RNG, timers=False):
+        self.snapshot_path = f"{path}.snap"
+        self.journal_path = f"{path}.journal"
+        self.world = world
+        self.rng = rng
+        self.timers = timers
+        self._journal = None
+
+    def load(self):
+        """Восстанавливает состояние из снимка и хвоста журнала.
+
+        Снимок читается через отображение файла в память. Повреждённый
+        хвост журнала отрезается, чтобы новые записи шли за последней
+        целой. Новая игра сразу получает снимок: в нём запоминается
+        генератор, с которым будет повторяться журнал.
+
+        Returns:
+            Состояние игры (GameState); новая игра, если сохранения нет
+        """
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                game_state, offset = decode_state(buffer, self.world)
+        else:
+            game_state = create_game_state(self.world, self.rng, self.timers)
+            offset = 0
+
+        for command, answers, offset in read_journal(self.journal_path, offset):
+            replay_turn(game_state, command, answers)
+
+        self._open_journal(offset)
+        if not os.path.exists(self.snapshot_path):
+            self.checkpoint(game_state)
+        return game_state
+
+    def _open_journal(self, valid_end):
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "ab")
+        if self._journal.tell() > valid_end:
+            self._journal.truncate(valid_end)
+            self._journal.seek(valid_end)
+
+    def record(self, command, answers=()):
+        """Дописывает выполненный ход в журнал.
+
+        Args:
+            command: Строка команды
+            answers: Ответы, которые команда запросила
+        """
+        if self._journal is None:
+            self._open_journal(0)
+        self._journal.write(encode_record(command, answers))
+        self._journal.flush()
+
+    def checkpoint(self, game_state, executor=None):
+        """Записывает снимок состояния.
+
+        Кодирование выполняется сразу, чтобы снимок был согласован с
+        журналом; запись файла можно отдать в пул потоков executor,
+        тогда ход сессии не ждёт диска.
+
+        Args:
+            game_state: Состояние игры (GameState)
+            executor: Пул для фоновой записи или None
+
+        Returns:
+            Future записи при заданном executor, иначе None
+        """
+        if self._journal is None:
+            self._open_journal(0)
+        data = encode_state(game_state, self._journal.tell())
+        # Фоновые снимки одного слота могут писаться одновременно. Какой
+        # из них заменит файл последним, неважно — снимок хранит своё
+        # смещение, и хвост журнала повторится
+        if executor is not None:
+            return executor.submit(write_atomic, self.snapshot_path, data)
+        write_atomic(self.snapshot_path, data)
+        return None
+
+    def reset(self):
+        """Удаляет сохранение, чтобы начать новую игру."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        """Закрывает файл журнала."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
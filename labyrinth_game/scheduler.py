@@ -0,0 +1,217 @@
+import itertools
+
+# Иерархическое колесо таймеров: LEVELS уровней по 2**WHEEL_BITS ячеек.
+# Ячейка уровня level охватывает 2**(WHEEL_BITS * level) тиков
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+LEVELS = 4
+
+_handlers = {}
+
+
+def register_handler(name, handler):
+    """Регистрирует обработчик, который можно назначить по имени.
+
+    Таймер хранит имя обработчика и строковые аргументы, а не функцию,
+    поэтому его можно скопировать, передать другому процессу и
+    записать в сохранение.
+
+    Args:
+        name: Название обработчика
+        handler: Функция handler(*context, *args), где context передаётся
+            в Scheduler.advance (в игре — состояние игры)
+    """
+    _handlers[name] = handler
+
+
+class Timer:
+    """Запланированное событие.
+
+    Attributes:
+        deadline: Тик, на котором событие сработает
+        name: Название обработчика (см. register_handler)
+        args: Аргументы обработчика
+        period: Период повторения в тиках или 0 для разового события
+        active: Ждёт ли событие срабатывания (False после отмены)
+        order: Порядковый номер: события одного тика срабатывают по нему
+    """
+
+    __slots__ = ("deadline", "name", "args", "period", "active", "order")
+
+    def __init__(self, deadline, name, args, period, order):
+        self.deadline = deadline
+        self.name = name
+        self.args = args
+        self.period = period
+        self.active = True
+        self.order = order
+
+    def __repr__(self):
+        return (
+            f"Timer(deadline={self.deadline}, name={self.name!r}, "
+            f"args={self.args!r}, period={self.period})"
+        )
+
+
+class Scheduler:
+    """Планировщик событий по игровым тикам на иерархическом колесе.
+
+    Событие кладётся в ячейку уровня, соответствующего его удалённости,
+    и спускается на уровень ниже, когда время доходит до его ячейки.
+    Постановка и отмена работают за O(1), а тик обходит только ячейку,
+    события которой наступили, поэтому его цена не зависит от числа
+    ожидающих событий. Ячейки создаются по мере надобности, и пустой
+    планировщик почти не занимает памяти.
+
+    Отменённое событие лишь помечается и выбрасывается, когда до него
+    доходит колесо.
+
+    Attributes:
+        now: Текущий тик
+    """
+
+    __slots__ = ("now", "_levels", "_count", "_orders")
+
+    def __init__(self, now=0):
+        self.now = now
+        self._levels = [{} for _ in range(LEVELS)]
+        self._count = 0
+        self._orders = itertools.count()
+
+    def schedule(self, delay, name, *args, period=0):
+        """Планирует событие через delay тиков.
+
+        Args:
+            delay: Через сколько тиков сработать (не меньше 1)
+            name: Название обработчика
+            *args: Аргументы обработчика
+            period: Период повторения в тиках или 0
+
+        Returns:
+            Таймер (Timer), который можно передать в cancel
+
+        Raises:
+            ValueError: Если delay или period меньше допустимого
+        """
+        if delay < 1 or period < 0:
+            raise ValueError("Задержка должна быть не меньше одного тика")
+        timer = Timer(self.now + delay, name, args, period, next(self._orders))
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        """Отменяет событие; повторная отмена ничего не делает."""
+        if timer.active:
+            timer.active = False
+            self._count -= 1
+
+    def _place(self, timer):
+        delta = timer.deadline - self.now
+        level = 0
+        while level < LEVELS - 1 and delta >= 1 << (WHEEL_BITS * (level + 1)):
+            level += 1
+        slot = (timer.deadline >> (WHEEL_BITS * level)) & WHEEL_MASK
+        self._levels[level].setdefault(slot, []).append(timer)
+
+    def _tick(self):
+        """Переходит на следующий тик и возвращает наступившие события."""
+        self.now += 1
+        now = self.now
+        for level in range(1, LEVELS):
+            if now & ((1 << (WHEEL_BITS * level)) - 1):
+                break
+            slot = (now >> (WHEEL_BITS * level)) & WHEEL_MASK
+            for timer in self._levels[level].pop(slot, ()):
+                if timer.active:
+                    self._place(timer)
+        due = self._levels[0].pop(now & WHEEL_MASK, None)
+        if not due:
+            return ()
+        due.sort(key=_order)
+        return due
+
+    def advance(self, now, *context):
+        """Продвигает время до тика now и выполняет наступившие события.
+
+        Повторяющееся событие планируется заново до вызова обработчика,
+        так что обработчик может его отменить.
+
+        Args:
+            now: Новый текущий тик
+            *context: Первые аргументы обработчиков
+
+        Returns:
+            Число выполненных событий
+        """
+        fired = 0
+        while self.now < now:
+            if not self._count:
+                # Ждать нечего: отменённые события выбрасываются разом
+                self._levels = [{} for _ in range(LEVELS)]
+                self.now = now
+                break
+            for timer in self._tick():
+                if not timer.active:
+                    continue
+                if timer.period:
+                    timer.deadline += timer.period
+                    self._place(timer)
+                else:
+                    timer.active = False
+                    self._count -= 1
+                _handlers[timer.name](*context, *timer.args)
+                fired += 1
+        return fired
+
+    def pending(self):
+        """Возвращает ожидающие события в порядке срабатывания."""
+        timers = [
+            timer
+            for level in self._levels
+            for bucket in level.values()
+            for timer in bucket
+            if timer.active
+        ]
+        timers.sort(key=_deadline_order)
+        return timers
+
+    def copy(self):
+        """Создаёт независимую копию с теми же ожидающими событиями."""
+        scheduler = Scheduler(self.now)
+        for timer in self.pending():
+            scheduler._place(Timer(
+                timer.deadline, timer.name, timer.args, timer.period,
+                next(scheduler._orders),
+            ))
+            scheduler._count += 1
+        return scheduler
+
+    def __len__(self):
+        return self._count
+
+    def __reduce__(self):
+        return _restore, (self.now, [
+            (timer.deadline, timer.name, timer.args, timer.period)
+            for timer in self.pending()
+        ])
+
+    def __repr__(self):
+        return f"Scheduler(now={self.now}, pending={self._count})"
+
+
+def _order(timer):
+    return timer.order
+
+
+def _deadline_order(timer):
+    return timer.deadline, timer.order
+
+
+def _restore(now, timers):
+    """Восстанавливает планировщик из тика и списка событий."""
+    scheduler = Scheduler(now)
+    for deadline, name, args, period in timers:
+        scheduler.schedule(deadline - now, name, *args, period=period)
+    return scheduler
@@ -0,0 +1,99 @@
+import argparse
+import sys
+
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import BufferedSink, NullSink, use_sink
+from labyrinth_game.world import create_game_state
+
+CHUNK_SIZE = 1 << 20
+FLUSH_EVERY = 4096
+
+
+def iter_lines(stream, chunk_size=CHUNK_SIZE):
+    """Читает строки из двоичного потока крупными блоками.
+
+    Args:
+        stream: Двоичный поток (файл или канал)
+        chunk_size: Размер блока чтения в байтах
+
+    Yields:
+        Строки без пробелов по краям, как их вернула бы get_input
+    """
+    tail = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8", errors="replace").strip()
+    if tail:
+        yield tail.decode("utf-8", errors="replace").strip()
+
+
+def run_lines(game_state, lines, sink, flush_every=FLUSH_EVERY):
+    """Проигрывает записанный ввод: команды и ответы на загадки подряд.
+
+    Строки читаются так же, как в консоли: если команда ждёт ответа,
+    следующая строка становится ответом. Вывод сбрасывается в sink
+    раз в flush_every строк, а не после каждого хода.
+
+    Args:
+        game_state: Состояние игры (GameState), изменяется на месте
+        lines: Итерируемый объект строк ввода
+        sink: Приёмник вывода
+        flush_every: Через сколько строк сбрасывать вывод
+
+    Returns:
+        Число прочитанных строк
+    """
+    steps = None
+    count = 0
+    with use_sink(sink):
+        for count, line in enumerate(lines, 1):
+            if steps is None:
+                if game_state.game_over:
+                    count -= 1
+                    break
+                steps = process_command_steps(game_state, line)
+                line = None
+            try:
+                steps.send(line)
+            except StopIteration:
+                steps = None
+
+            if count % flush_every == 0:
+                sink.flush()
+
+        if steps is not None:
+            steps.close()
+        sink.flush()
+    return count
+
+
+def main():
+    """Точка входа: проигрывает файл или канал с записанными командами."""
+    parser = argparse.ArgumentParser(
+        description="Проигрывание записанных команд Лабиринта сокровищ",
+    )
+    parser.add_argument("path", nargs="?", default="-",
+                        help="файл с командами ('-' — стандартный ввод)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="не выводить текст игры")
+    args = parser.parse_args()
+
+    sink = NullSink() if args.quiet else BufferedSink(sys.stdout)
+    game_state = create_game_state()
+    if args.path == "-":
+        count = run_lines(game_state, iter_lines(sys.stdin.buffer), sink)
+    else:
+        with open(args.path, "rb") as stream:
+            count = run_lines(game_state, iter_lines(stream), sink)
+
+    print(f"Строк: {count}, шагов: {game_state.steps_taken}, "
+          f"исход: {game_state.outcome or 'игра не окончена'}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
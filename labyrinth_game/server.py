@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import time
+
+from labyrinth_game.commands import parse_command
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.metrics import enable_metrics, get_metrics, write_metrics
+from labyrinth_game.output import BufferedSink, say, use_sink
+from labyrinth_game.rng import SIN_RNG, CounterRandom
+from labyrinth_game.routes import prepare_route
+from labyrinth_game.utils import describe_current_room, show_help
+from labyrinth_game.world import create_game_state
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4000
+# Как часто сервер переписывает файлы метрик, секунды
+METRICS_INTERVAL = 15
+SHARD_FAILURE = "\nОшибка сервера: сессия прервана.\n"
+
+
+def advance(steps, answer, output):
+    """Продвигает пошаговую команду до следующего запроса ввода.
+
+    Игровая логика синхронна и выполняется без переключения задач,
+    поэтому временная подмена приёмника вывода не смешивает вывод сессий.
+
+    Args:
+        steps: Генератор пошаговой команды
+        answer: Ответ игрока (None для первого шага)
+        output: Приёмник вывода сессии (BufferedSink)
+
+    Returns:
+        Текст следующего приглашения или None, если команда завершена
+    """
+    with use_sink(output):
+        try:
+            return steps.send(answer)
+        except StopIteration:
+            return None
+
+
+async def ask(reader, writer, output, prompt):
+    """Отправляет накопленный вывод и приглашение, затем ждёт строку.
+
+    Args:
+        reader: Поток чтения соединения
+        writer: Поток записи соединения
+        output: Приёмник вывода сессии (BufferedSink)
+        prompt: Приглашение для ввода
+
+    Returns:
+        Строка без перевода строки или None, если клиент отключился
+    """
+    writer.write((output.take() + prompt).encode("utf-8"))
+    await writer.drain()
+
+    line = await reader.readline()
+    if not line:
+        return None
+    return line.decode("utf-8", errors="replace").strip()
+
+
+async def prepare(game_state, command_line):
+    """Готовит тяжёлую часть команды в пуле потоков.
+
+    Таблица маршрутов travel строится вне цикла событий (см.
+    routes.prepare_route), чтобы поиск пути в большом мире не
+    задерживал остальные сессии; сама команда затем берёт её из кэша.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        command_line: Строка ввода пользователя
+    """
+    if not command_line:
+        return
+    command, arg = parse_command(command_line)
+    if command is not None and command.name == "travel" and arg:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, prepare_route, game_state, arg)
+
+
+async def handle_client(reader, writer, world=ROOMS, rng=SIN_RNG, history=None):
+    """Проводит одну игровую сессию по TCP-соединению.
+
+    Каждое соединение получает собственное состояние игры, а загадки
+    ожидают ответ через await, не блокируя остальных игроков.
+
+    Args:
+        reader: Поток чтения соединения
+        writer: Поток записи соединения
+        world: Словарь комнат, общий для всех сессий
+        rng: Генератор случайных событий сессии
+        history: История игр (history.RunHistory) или None
+    """
+    game_state = create_game_state(world, rng)
+    started = time.monotonic()
+    output = BufferedSink()
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.attach(game_state)
+
+    with use_sink(output):
+        say("Добро пожаловать в Лабиринт сокровищ!")
+        describe_current_room(game_state)
+        show_help()
+
+    try:
+        while not game_state.game_over:
+            command = await ask(reader, writer, output, "> ")
+            if command is None:
+                return
+
+            await prepare(game_state, command)
+            steps = process_command_steps(game_state, command)
+            prompt = advance(steps, None, output)
+            while prompt is not None:
+                answer = await ask(reader, writer, output, prompt)
+                if answer is None:
+                    steps.close()
+                    return
+                prompt = advance(steps, answer, output)
+
+        if history is not None:
+            history.record(game_state, time.monotonic() - started)
+        writer.write(output.take().encode("utf-8"))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def handle_sharded_client(reader, writer, world, rng=SIN_RNG,
+                                history=None):
+    """Проводит сессию игрока в общем мире, разделённом на шарды.
+
+    Команды выполняются в процессах-шардах (см. shard.ShardedWorld),
+    а сессия лишь ждёт их результат, не занимая цикл событий.
+
+    Args:
+        reader: Поток чтения соединения
+        writer: Поток записи соединения
+        world: Общий мир (ShardedWorld)
+        rng: Генератор случайных событий сессии
+        history: История игр (history.RunHistory) или None
+    """
+    from labyrinth_game.shard import ShardError
+
+    session = world.join(rng)
+    started = time.monotonic()
+    output = BufferedSink()
+
+    with use_sink(output):
+        say("Добро пожаловать в Лабиринт сокровищ!")
+    _, text = await asyncio.wrap_future(world.submit(session, "look"))
+    output.write(text)
+    with use_sink(output):
+        show_help()
+
+    try:
+        while not session.state.game_over:
+            command = await ask(reader, writer, output, "> ")
+            if command is None:
+                return
+
+            await prepare(session.state, command)
+            future = world.submit(session, command)
+            prompt, text = await asyncio.wrap_future(future)
+            output.write(text)
+            while prompt is not None:
+                answer = await ask(reader, writer, output, prompt)
+                if answer is None:
+                    await asyncio.wrap_future(world.cancel(session))
+                    return
+                prompt, text = await asyncio.wrap_future(
+                    world.answer(session, answer),
+                )
+                output.write(text)
+
+        if history is not None:
+            history.record(session.state, time.monotonic() - started)
+        writer.write(output.take().encode("utf-8"))
+        await writer.drain()
+    except ConnectionError:
+        if session.pinned is not None:
+            await asyncio.wrap_future(world.cancel(session))
+    except ShardError:
+        # Шард потерял команду: продолжать сессию не с чем
+        with contextlib.suppress(ConnectionError):
+            writer.write((output.take() + SHARD_FAILURE).encode("utf-8"))
+            await writer.drain()
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def export_metrics(metrics, path, interval=METRICS_INTERVAL):
+    """Периодически записывает метрики в PATH.json и PATH.prom.
+
+    Args:
+        metrics: Включённые метрики (Metrics)
+        path: Путь к файлам метрик без расширения
+        interval: Пауза между записями, секунды
+    """
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            write_metrics(metrics, path)
+    finally:
+        write_metrics(metrics, path)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, world=ROOMS,
+                metrics_path=None, rng=SIN_RNG, sharded=None, history=None):
+    """Запускает игровой сервер и обслуживает соединения до остановки.
+
+    Args:
+        host: Адрес для прослушивания
+        port: Порт для прослушивания
+        world: Словарь комнат, общий для всех сессий
+        metrics_path: Путь к файлам метрик без расширения или None,
+            если метрики не собираются
+        rng: Генератор, от которого каждая сессия получает свой поток
+            (см. rng.CounterRandom.spawn)
+        sharded: Общий мир на шардах (shard.ShardedWorld) или None, если
+            у каждой сессии своя копия мира
+        history: История игр (history.RunHistory) или None
+
+    Raises:
+        ValueError: Если метрики запрошены вместе с шардами: команды
+            выполняются в процессах шардов, и сервер их не видит
+    """
+    if metrics_path is not None and sharded is not None:
+        raise ValueError("Метрики не собираются в режиме шардов")
+    # Включаются до приёма соединений, чтобы измерялась каждая сессия
+    metrics = enable_metrics() if metrics_path is not None else None
+    sessions = itertools.count()
+
+    def start_session(reader, writer):
+        session_rng = rng.spawn(next(sessions))
+        if sharded is not None:
+            return handle_sharded_client(
+                reader, writer, sharded, session_rng, history,
+            )
+        return handle_client(reader, writer, world, session_rng, history)
+
+    server = await asyncio.start_server(start_session, host, port)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Сервер Лабиринта сокровищ слушает {addresses}")
+
+    exporter = None
+    if metrics is not None:
+        exporter = asyncio.create_task(export_metrics(metrics, metrics_path))
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if exporter is not None:
+            exporter.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await exporter
+
+
+def main():
+    """Точка входа сетевого режима игры."""
+    parser = argparse.ArgumentParser(description="Сервер Лабиринта сокровищ")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int,
+                        help="ключ генератора событий: у каждой сессии "
+                             "свой поток")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="писать метрики в PATH.json и PATH.prom")
+    parser.add_argument("--world", metavar="PATH",
+                        help="файл мира (см. labyrinth_game.worldfile)")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="общий мир для всех игроков, комнаты которого "
+                             "разделены между N процессами")
+    parser.add_argument("--history", metavar="PATH",
+                        help="записывать законченные игры в базу истории")
+    args = parser.parse_args()
+    if args.metrics and args.shards:
+        parser.error("--metrics нельзя сочетать с --shards: команды "
+                     "выполняются в процессах шардов")
+
+    world = ROOMS
+    if args.world:
+        from labyrinth_game.worldfile import load_world
+
+        world = load_world(args.world)
+
+    rng = SIN_RNG if args.seed is None else CounterRandom(args.seed)
+    sharded = None
+    if args.shards:
+        from labyrinth_game.shard import ShardedWorld
+
+        sharded = ShardedWorld(args.shards, args.world)
+    history = None
+    if args.history:
+        from labyrinth_game.history import RunHistory
+
+        history = RunHistory(args.history)
+    with sharded or contextlib.nullcontext(), \
+            history or contextlib.nullcontext(), \
+            contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(
+            args.host, args.port, world, args.metrics, rng, sharded, history,
+        ))
+
+
+if __name__ == "__main__":
+    main()
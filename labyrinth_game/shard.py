@@ -0,0 +1,431 @@
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import traceback
+import zlib
+from concurrent.futures import Future
+
+from labyrinth_game.commands import parse_command
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import BufferedSink, use_sink
+from labyrinth_game.player_actions import move_player
+from labyrinth_game.rng import SIN_RNG
+from labyrinth_game.routes import next_hop
+from labyrinth_game.world import GameState, create_game_state
+
+# Поля игрока, которые путешествуют между роутером и шардами; комнаты
+# в их число не входят — ими владеют шарды
+PLAYER_FIELDS = (
+    "current_room",
+    "player_inventory",
+    "steps_taken",
+    "game_over",
+    "outcome",
+    "cause",
+    "rng",
+    "timers",
+)
+DIRECTIONS = ("north", "south", "east", "west")
+
+
+class ShardError(RuntimeError):
+    """Команда упала в процессе шарда или шард завершился, не ответив."""
+
+
+def room_owner(room_name, shards):
+    """Возвращает номер шарда, владеющего комнатой.
+
+    Используется crc32, а не hash(): распределение должно совпадать во
+    всех процессах.
+    """
+    return zlib.crc32(room_name.encode("utf-8")) % shards
+
+
+def _pack(game_state):
+    return tuple(getattr(game_state, name) for name in PLAYER_FIELDS)
+
+
+def _unpack(game_state, fields):
+    for name, value in zip(PLAYER_FIELDS, fields):
+        setattr(game_state, name, value)
+
+
+def _load(world_path):
+    if world_path is None:
+        return ROOMS
+    from labyrinth_game.worldfile import load_world
+
+    return load_world(world_path)
+
+
+def _hop_steps(game_state, direction, describe):
+    """Один шаг travel: перемещение, описание — только у цели пути."""
+    move_player(game_state, direction, describe=describe)
+    return
+    yield
+
+
+def _serve_shard(world_path, requests, results):
+    """Цикл рабочего процесса шарда.
+
+    Шард хранит слой изменённых комнат и кэш их описаний, общие для всех
+    игроков, чьи команды он выполняет. Запросы обрабатываются строго по
+    очереди, поэтому изменения каждой комнаты упорядочены её владельцем.
+    Вместо строки команды может прийти шаг travel — пара (направление,
+    выводить ли описание).
+
+    Ответы идут в собственный канал шарда, а не в общую очередь: шард,
+    умерший посреди записи, не унесёт с собой её межпроцессную блокировку.
+    """
+    world = _load(world_path)
+    rooms = {}
+    views = {}
+    pending = {}
+    output = BufferedSink()
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        request_id, player_id, fields, line, answer = message
+        try:
+            result = _serve_message(
+                world, rooms, views, pending, output,
+                player_id, fields, line, answer,
+            )
+        except Exception:
+            # Исключение передаётся текстом: не всякое можно передать
+            # между процессами
+            pending.pop(player_id, None)
+            output.take()
+            results.send((request_id, None, "", None, traceback.format_exc()))
+        else:
+            results.send((request_id, *result, None))
+
+
+def _serve_message(world, rooms, views, pending, output,
+                   player_id, fields, line, answer):
+    """Выполняет один запрос шарда.
+
+    Returns:
+        Тройку (поля игрока, текст вывода, приглашение или None)
+    """
+    if fields is None and answer is None:
+        # Игрок ушёл, не ответив на запрос команды
+        game_state, steps = pending.pop(player_id)
+        steps.close()
+        return _pack(game_state), "", None
+
+    if fields is not None:
+        game_state = GameState(world)
+        game_state.rooms = rooms
+        game_state.views = views
+        _unpack(game_state, fields)
+        if isinstance(line, tuple):
+            steps = _hop_steps(game_state, *line)
+        else:
+            steps = process_command_steps(game_state, line)
+    else:
+        game_state, steps = pending.pop(player_id)
+
+    with use_sink(output):
+        try:
+            prompt = steps.send(answer)
+        except StopIteration:
+            prompt = None
+    if prompt is not None:
+        pending[player_id] = (game_state, steps)
+    return _pack(game_state), output.take(), prompt
+
+
+class ShardSession:
+    """Игрок общего мира на стороне роутера.
+
+    Attributes:
+        player_id: Номер игрока
+        state: Состояние игрока (GameState); его комнаты не используются
+        pinned: Шард, ожидающий ответа на запрос команды, или None
+    """
+
+    __slots__ = ("player_id", "state", "pinned")
+
+    def __init__(self, player_id, state):
+        self.player_id = player_id
+        self.state = state
+        self.pinned = None
+
+
+class ShardedWorld:
+    """Общий мир, комнаты которого разделены между процессами-шардами.
+
+    Каждая комната принадлежит одному шарду (room_owner): только он
+    изменяет её предметы, загадку и счётчик попыток. Роутер хранит
+    состояние игроков и отправляет каждую команду шарду комнаты, которую
+    она затрагивает. Перемещение выполняет владелец комнаты назначения:
+    выходы статичны, поэтому их можно прочитать где угодно, а событие
+    после перехода изменяет уже комнату назначения. Так игрок передаётся
+    другому шарду на границе, и следующие команды уходят новому владельцу.
+
+    Пошаговые команды (solve) закрепляют игрока за шардом до ответа.
+    Команда travel проходит через комнаты разных шардов, поэтому роутер
+    выполняет её как цепочку перемещений, каждое — у своего владельца.
+
+    Если команда упала в шарде или шард завершился, её Future завершается
+    исключением ShardError, а состояние игрока остаётся прежним.
+
+    Attributes:
+        world: Данные мира для маршрутизации (статичные выходы)
+        shards: Число шардов
+    """
+
+    def __init__(self, shards=None, world_path=None):
+        self.world = _load(world_path)
+        self.shards = shards or os.cpu_count() or 1
+        self._players = itertools.count()
+        self._requests = itertools.count()
+        self._futures = {}
+        self._dead = set()
+        self._lock = threading.Lock()
+
+        context = multiprocessing.get_context()
+        self._queues = []
+        self._results = []
+        self._processes = []
+        for _ in range(self.shards):
+            requests = context.Queue()
+            results, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_serve_shard, args=(world_path, requests, sender),
+                daemon=True,
+            )
+            process.start()
+            # Без копии роутера канал закроется вместе с шардом
+            sender.close()
+            self._queues.append(requests)
+            self._results.append(results)
+            self._processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def join(self, rng=SIN_RNG):
+        """Добавляет нового игрока у входа.
+
+        Returns:
+            Сессия игрока (ShardSession)
+        """
+        return ShardSession(next(self._players), create_game_state(self.world, rng))
+
+    def route(self, game_state, command_line):
+        """Выбирает шард для команды.
+
+        Returns:
+            Номер шарда
+        """
+        current = game_state.current_room
+        command, arg = parse_command(command_line) if command_line else (None, None)
+        direction = None
+        if command is not None:
+            if command.name == "go":
+                direction = arg
+            elif command.name in DIRECTIONS:
+                direction = command.name
+
+        target = self.world[current]["exits"].get(direction) if direction else None
+        return room_owner(target or current, self.shards)
+
+    def submit(self, session, command_line):
+        """Отправляет команду игрока на шард.
+
+        Returns:
+            Future с парой (приглашение или None, текст вывода); состояние
+            игрока обновляется до того, как Future завершится
+        """
+        if session.pinned is not None:
+            raise RuntimeError("Команда ждёт ответа: используйте answer()")
+        if command_line:
+            command, arg = parse_command(command_line)
+            if command is not None and command.name == "travel" and arg:
+                return self._travel(session, arg)
+        shard = self.route(session.state, command_line)
+        return self._send(shard, session, _pack(session.state), command_line, None)
+
+    def answer(self, session, text):
+        """Отправляет ответ на запрос команды шарду, который его ждёт.
+
+        Returns:
+            Future, как у submit
+        """
+        if session.pinned is None:
+            raise RuntimeError("Нет команды, ожидающей ответа")
+        return self._send(session.pinned, session, None, None, text)
+
+    def cancel(self, session):
+        """Прерывает команду, ожидающую ответа (например, при отключении).
+
+        Returns:
+            Future, как у submit
+        """
+        if session.pinned is None:
+            raise RuntimeError("Нет команды, ожидающей ответа")
+        return self._send(session.pinned, session, None, None, None)
+
+    def _travel(self, session, room_name):
+        """Выполняет travel по шагам, каждый на шарде комнаты назначения.
+
+        Вывод совпадает с player_actions.travel: те же тексты отказов и
+        описание только у комнаты назначения.
+        """
+        result = Future()
+        parts = []
+
+        def step(previous=None, current_room=None):
+            state = session.state
+            if previous is not None:
+                error = previous.exception()
+                if error is not None:
+                    result.set_exception(error)
+                    return
+                parts.append(previous.result()[1])
+                if state.current_room == current_room:
+                    result.set_result((None, "".join(parts)))
+                    return
+            if state.game_over or (parts and state.current_room == room_name):
+                result.set_result((None, "".join(parts)))
+                return
+
+            try:
+                direction = next_hop(state, room_name)
+            except KeyError:
+                direction, refusal = None, "Такой комнаты нет.\n"
+            else:
+                if state.current_room == room_name:
+                    refusal = "Вы уже здесь.\n"
+                else:
+                    refusal = "Дальше пути нет.\n" if parts else "Туда не пройти.\n"
+            if direction is None:
+                parts.append(refusal)
+                result.set_result((None, "".join(parts)))
+                return
+
+            current_room = state.current_room
+            target = self.world[current_room]["exits"][direction]
+            future = self._send(
+                room_owner(target, self.shards), session, _pack(state),
+                (direction, target == room_name), None,
+            )
+            future.add_done_callback(lambda done: step(done, current_room))
+
+        step()
+        return result
+
+    def _send(self, shard, session, fields, line, answer):
+        future = Future()
+        request_id = next(self._requests)
+        with self._lock:
+            dead = shard in self._dead
+            if not dead:
+                self._futures[request_id] = (future, session, shard)
+        if dead:
+            session.pinned = None
+            future.set_exception(ShardError(f"Шард {shard} не работает"))
+            return future
+        self._queues[shard].put((request_id, session.player_id, fields, line, answer))
+        return future
+
+    def _collect(self):
+        """Разбирает ответы шардов, пока все они не завершатся.
+
+        Вместе с каналами ожидаются и сигналы завершения процессов, так что
+        смерть шарда замечается сразу, а не по тайм-ауту.
+        """
+        owners = {}
+        for shard, (results, process) in enumerate(
+            zip(self._results, self._processes)
+        ):
+            owners[results] = owners[process.sentinel] = shard
+        while owners:
+            for ready in multiprocessing.connection.wait(list(owners)):
+                shard = owners.get(ready)
+                if shard is None:
+                    continue
+                results = self._results[shard]
+                try:
+                    if ready is results:
+                        self._deliver(shard, results.recv())
+                        continue
+                    # Процесс завершился: сначала дочитываются его ответы
+                    while results.poll():
+                        self._deliver(shard, results.recv())
+                except EOFError:
+                    pass
+                del owners[results], owners[self._processes[shard].sentinel]
+                self._fail_shard(shard)
+
+    def _deliver(self, shard, message):
+        request_id, fields, text, prompt, error = message
+        with self._lock:
+            future, session, _ = self._futures.pop(request_id)
+        if error is not None:
+            session.pinned = None
+            future.set_exception(ShardError(f"Ошибка в шарде {shard}:\n{error}"))
+            return
+        _unpack(session.state, fields)
+        session.pinned = shard if prompt is not None else None
+        future.set_result((prompt, text))
+
+    def _fail_shard(self, shard):
+        """Завершает ошибкой запросы к остановившемуся шарду."""
+        process = self._processes[shard]
+        process.join()
+        with self._lock:
+            self._dead.add(shard)
+            failed = [
+                request_id for request_id, (_, _, owner) in self._futures.items()
+                if owner == shard
+            ]
+            entries = [self._futures.pop(request_id) for request_id in failed]
+        for future, session, _ in entries:
+            session.pinned = None
+            future.set_exception(ShardError(
+                f"Шард {shard} завершился (код {process.exitcode})"
+            ))
+
+    def execute(self, session, command_line, answers=()):
+        """Выполняет команду целиком, отвечая заготовленными ответами.
+
+        Returns:
+            Текст вывода команды
+
+        Raises:
+            ValueError: Если ответов не хватило на все запросы
+        """
+        prompt, text = self.submit(session, command_line).result()
+        parts = [text]
+        answers = iter(answers)
+        while prompt is not None:
+            answer = next(answers, None)
+            if answer is None:
+                raise ValueError(f"Не хватило ответов для команды {command_line!r}")
+            prompt, text = self.answer(session, answer).result()
+            parts.append(text)
+        return "".join(parts)
+
+    def close(self):
+        """Останавливает шарды и поток сбора результатов."""
+        for requests in self._queues:
+            requests.put(None)
+        for process in self._processes:
+            process.join()
+        self._collector.join()
+        for results in self._results:
+            results.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
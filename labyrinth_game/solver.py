@@ -0,0 +1,390 @@
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.graph import get_graph
+from labyrinth_game.main import process_command_steps
+from labyrinth_game.output import NullSink, use_sink
+from labyrinth_game.world import copy_state, create_game_state, get_room
+
+# Заведомо неверный ответ: нужен, чтобы исследовать ветки с ошибками
+WRONG_ANSWER = "?"
+
+# Минимальный размер фронта, который имеет смысл раздавать процессам
+PARALLEL_THRESHOLD = 512
+
+# Глубина режима --ci: кратчайшая победа в ROOMS занимает 7 команд, запас
+# в три команды оставляет обходные пути, а поиск с отсечением укладывается
+# в доли секунды
+CI_MAX_DEPTH = 10
+
+
+def state_key(game_state):
+    """Возвращает хэшируемый ключ состояния для таблицы транспозиций.
+
+    В ключ входят комната, инвентарь, флаги загадок и предметы изменённых
+    комнат, а также steps_taken и ожидающие таймеры: от них зависят
+    случайные события и износ предметов.
+
+    Args:
+        game_state: Состояние игры (GameState)
+
+    Returns:
+        Кортеж, однозначно описывающий состояние
+    """
+    rooms = tuple(sorted(
+        (name, tuple(room["items"]), room["puzzle"] is None,
+         room.get("puzzle_attempts", 0))
+        for name, room in game_state.rooms.items()
+    ))
+    timers = None
+    if game_state.timers is not None:
+        timers = tuple(
+            (timer.deadline, timer.name, timer.args, timer.period)
+            for timer in game_state.timers.pending()
+        )
+    return (
+        game_state.current_room,
+        tuple(game_state.player_inventory),
+        game_state.steps_taken,
+        game_state.outcome,
+        rooms,
+        timers,
+    )
+
+
+def apply_action(game_state, command, answers=()):
+    """Применяет команду к копии состояния без вывода на экран.
+
+    Действие считается допустимым, только если команда запросила ровно
+    столько ответов, сколько передано.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        command: Строка команды
+        answers: Ответы на запросы команды
+
+    Returns:
+        Новое состояние или None, если число ответов не подошло
+    """
+    new_state = copy_state(game_state)
+    steps = process_command_steps(new_state, command)
+    remaining = len(answers)
+    with use_sink(NullSink()):
+        try:
+            steps.send(None)
+            for answer in answers:
+                remaining -= 1
+                steps.send(answer)
+        except StopIteration:
+            return new_state if remaining == 0 else None
+        steps.close()
+    return None
+
+
+def candidate_actions(game_state):
+    """Перечисляет действия, которые стоит попробовать в состоянии.
+
+    Args:
+        game_state: Состояние игры (GameState)
+
+    Returns:
+        Список пар (команда, кортеж ответов)
+    """
+    room = get_room(game_state, game_state.current_room)
+    actions = [(f"go {direction}", ()) for direction in room["exits"]]
+    actions += [(f"take {item}", ()) for item in dict.fromkeys(room["items"])]
+    actions += [
+        (f"use {item}", ())
+        for item in dict.fromkeys(game_state.player_inventory)
+    ]
+
+    if room["puzzle"] is None:
+        actions.append(("solve", ()))
+    else:
+        answer = room["puzzle"][1]
+        actions += [
+            ("solve", ()),
+            ("solve", (answer,)),
+            ("solve", (WRONG_ANSWER,)),
+            ("solve", ("да", answer)),
+            ("solve", ("да", WRONG_ANSWER)),
+        ]
+    return actions
+
+
+def expand(game_state):
+    """Возвращает все переходы, которые меняют состояние.
+
+    Args:
+        game_state: Состояние игры (GameState)
+
+    Returns:
+        Список троек (команда, ответы, новое состояние)
+    """
+    key = state_key(game_state)
+    successors = []
+    for command, answers in candidate_actions(game_state):
+        new_state = apply_action(game_state, command, answers)
+        if new_state is not None and state_key(new_state) != key:
+            successors.append((command, answers, new_state))
+    return successors
+
+
+def _expand_chunk(states):
+    return [expand(game_state) for game_state in states]
+
+
+def goal_distances(world=ROOMS):
+    """Считает расстояние в ходах от каждой комнаты до сундука.
+
+    Замки на дверях не учитываются, поэтому расстояние — нижняя оценка
+    числа команд до победы (плюс одна команда solve).
+
+    Args:
+        world: Словарь комнат в формате ROOMS
+
+    Returns:
+        Словарь {название комнаты: расстояние}; недостижимых комнат в нём нет
+    """
+    graph = get_graph(world)
+    incoming = [[] for _ in graph.room_names]
+    for room_id in range(len(graph.room_names)):
+        for _, target in graph.neighbours(room_id):
+            incoming[target].append(room_id)
+
+    chest_id = graph.item_ids.get("treasure_chest")
+    queue = deque(
+        room_id for room_id, items in enumerate(graph.room_items)
+        if chest_id in items
+    )
+    distance = dict.fromkeys(queue, 0)
+    while queue:
+        room_id = queue.popleft()
+        for source in incoming[room_id]:
+            if source not in distance:
+                distance[source] = distance[room_id] + 1
+                queue.append(source)
+    return {graph.room_names[room_id]: value for room_id, value in distance.items()}
+
+
+def _can_win(distances, room, depth, max_depth):
+    """Проверяет по goal_distances, успеет ли состояние дойти до сундука."""
+    bound = distances.get(room)
+    return bound is not None and depth + 1 + bound <= max_depth
+
+
+def solve(game_state=None, max_depth=25, full=True, processes=1, prune=False):
+    """Исследует пространство состояний поиском в ширину.
+
+    Таблица транспозиций хранит каждое состояние один раз вместе со
+    ссылкой на родителя, поэтому найденные пути кратчайшие по числу
+    команд. При full=False поиск останавливается на первой победе.
+    При prune=True или full=False состояния, из которых сундук
+    недостижим за оставшиеся команды (см. goal_distances), не
+    раскрываются.
+
+    Тупик — нетерминальное раскрытое состояние, из которого победа
+    недостижима за max_depth команд от начала игры. Нераскрытое
+    состояние считается проигранным, только если это доказывает
+    goal_distances, иначе его исход неизвестен; тупики считаются лишь
+    среди раскрытых состояний, поэтому они не зависят от того, где
+    остановился фронт.
+
+    Args:
+        game_state: Начальное состояние (по умолчанию новая игра)
+        max_depth: Максимальное число команд в пути
+        full: Исследовать ли всё пространство до max_depth
+        processes: Число процессов для раскрытия фронта
+        prune: Отсекать ли состояния, из которых сундук недостижим
+
+    Returns:
+        Словарь с ключами win_path и loss_path (списки пар (команда,
+        ответы) или None), states (число состояний), terminal (счётчик
+        пар (исход, причина)), dead_ends (тупики) и unknown (состояния,
+        исход которых не определён)
+    """
+    if game_state is None:
+        game_state = create_game_state()
+    distances = goal_distances(game_state.world)
+    prune = prune or not full
+
+    root = state_key(game_state)
+    parents = {root: None}
+    depths = {root: 0}
+    children = {}
+    terminal = Counter()
+    win_key = loss_key = None
+    frontier = [(root, game_state)]
+
+    executor = ProcessPoolExecutor(processes) if processes > 1 else None
+    try:
+        for depth in range(max_depth):
+            if not frontier or (win_key is not None and not full):
+                break
+
+            states = [state for _, state in frontier]
+            if executor is not None and len(states) >= PARALLEL_THRESHOLD:
+                size = -(-len(states) // (processes * 4))
+                chunks = [states[i:i + size] for i in range(0, len(states), size)]
+                expanded = [
+                    successors
+                    for chunk in executor.map(_expand_chunk, chunks)
+                    for successors in chunk
+                ]
+            else:
+                expanded = _expand_chunk(states)
+
+            next_frontier = []
+            for (key, _), successors in zip(frontier, expanded):
+                children[key] = []
+                for command, answers, new_state in successors:
+                    new_key = state_key(new_state)
+                    children[key].append(new_key)
+                    if new_key in parents:
+                        continue
+                    parents[new_key] = (key, command, answers)
+                    depths[new_key] = depth + 1
+
+                    if new_state.game_over:
+                        terminal[(new_state.outcome, new_state.cause)] += 1
+                        if new_state.outcome == "win" and win_key is None:
+                            win_key = new_key
+                        elif new_state.outcome == "loss" and loss_key is None:
+                            loss_key = new_key
+                        continue
+
+                    if prune and not _can_win(distances, new_state.current_room,
+                                              depth + 1, max_depth):
+                        continue
+                    next_frontier.append((new_key, new_state))
+            frontier = next_frontier
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    proven = {
+        key for key in parents
+        if key not in children
+        and not _can_win(distances, key[0], depths[key], max_depth)
+    }
+    status = _classify(parents, children, proven)
+    dead_ends = sum(
+        1 for key, value in status.items()
+        if value == "dead" and key[3] is None and key in children
+    )
+    return {
+        "win_path": _path(parents, win_key),
+        "loss_path": _path(parents, loss_key),
+        "states": len(parents),
+        "terminal": terminal,
+        "dead_ends": dead_ends,
+        "unknown": sum(1 for value in status.values() if value == "unknown"),
+    }
+
+
+def _path(parents, key):
+    """Восстанавливает путь до состояния по ссылкам на родителей."""
+    if key is None:
+        return None
+    path = []
+    while parents[key] is not None:
+        key, command, answers = parents[key]
+        path.append((command, answers))
+    path.reverse()
+    return path
+
+
+def _classify(parents, children, proven):
+    """Помечает состояния как win, dead или unknown.
+
+    Граф состояний ацикличен: steps_taken входит в ключ и растёт с каждой
+    командой. Поэтому статус считается обходом в глубину от листьев;
+    нераскрытый лист из proven проигран, остальные неизвестны.
+    """
+    status = {}
+    for key in parents:
+        if key[3] is not None:
+            status[key] = "win" if key[3] == "win" else "dead"
+
+    for start in parents:
+        if start in status:
+            continue
+        stack = [start]
+        while stack:
+            key = stack[-1]
+            if key in status:
+                stack.pop()
+                continue
+            if key not in children:
+                status[key] = "dead" if key in proven else "unknown"
+                stack.pop()
+                continue
+            pending = [child for child in children[key] if child not in status]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            values = {status[child] for child in children[key]}
+            if "win" in values:
+                status[key] = "win"
+            elif "unknown" in values:
+                status[key] = "unknown"
+            else:
+                status[key] = "dead"
+            stack.pop()
+    return status
+
+
+def format_path(path):
+    """Переводит путь в строки команд с ответами для вывода."""
+    lines = []
+    for command, answers in path:
+        suffix = f"  (ответы: {', '.join(answers)})" if answers else ""
+        lines.append(f"{command}{suffix}")
+    return lines
+
+
+def main():
+    """Точка входа: печатает кратчайшие пути и число тупиков.
+
+    Код возврата 1 означает, что победа недостижима в пределах глубины.
+    """
+    parser = argparse.ArgumentParser(description="Анализ Лабиринта сокровищ")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--fast", action="store_true",
+                        help="остановиться на первой победе")
+    parser.add_argument("--ci", action="store_true",
+                        help=f"проверка для CI: глубина {CI_MAX_DEPTH} "
+                             "и отсечение по расстоянию до сундука")
+    args = parser.parse_args()
+
+    max_depth = args.max_depth
+    if max_depth is None:
+        max_depth = CI_MAX_DEPTH if args.ci else 20
+    result = solve(max_depth=max_depth, full=not args.fast,
+                   processes=args.processes, prune=args.ci)
+
+    print(f"Исследовано состояний: {result['states']}")
+    for (outcome, cause), count in sorted(result["terminal"].items()):
+        print(f"  {outcome}/{cause}: {count}")
+    print(f"Тупиковых состояний (без победы за {max_depth} команд): "
+          f"{result['dead_ends']}")
+    print(f"Неопределённых состояний: {result['unknown']}")
+
+    for title, path in (("победы", result["win_path"]),
+                        ("поражения", result["loss_path"])):
+        if path is None:
+            print(f"\nПуть {title} не найден.")
+            continue
+        print(f"\nКратчайший путь {title}, команд: {len(path)}")
+        for line in format_path(path):
+            print(f"  {line}")
+
+    return 0 if result["win_path"] is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,61 +1,74 @@
-import math
+import functools
 
 from labyrinth_game.constants import (
     COMMANDS,
     EVENT_PROBABILITY,
     EVENT_TYPES,
     MAX_PUZZLE_ATTEMPTS,
-    ROOMS,
     TRAP_DAMAGE_THRESHOLD,
 )
+from labyrinth_game.output import flush_output, say
+from labyrinth_game.puzzles import get_puzzle, register_effect, run_effects
+from labyrinth_game.rng import (
+    LANE_EVENT,
+    LANE_EVENT_TYPE,
+    LANE_TRAP_DAMAGE,
+    LANE_TRAP_ITEM,
+    # Переехал в rng.py; прежний импорт из utils продолжает работать
+    pseudo_random,  # noqa: F401
+)
+from labyrinth_game.scheduler import register_handler
+from labyrinth_game.world import (
+    finish_game,
+    get_mutable_room,
+    get_room,
+    record_event,
+)
 
-
-def pseudo_random(seed, modulo):
-    """Генерирует псевдослучайное число на основе синуса.
-    
-    Args:
-        seed: Зерно (обычно шаги игрока)
-        modulo: Верхняя граница результата [0, modulo)
-    
-    Returns:
-        Целое число в диапазоне [0, modulo)
-    """
-    value = math.sin(seed * 12.9898) * 43758.5453
-    fractional = value - math.floor(value)
-    result = fractional * modulo
-    return int(math.floor(result))
+# Тексты неизменённых комнат общие для всех сессий: {id(world): (world, тексты)}
+_base_views = {}
 
 
 def trigger_trap(game_state):
     """Активирует ловушку с негативными последствиями для игрока.
     
     При наличии предметов удаляет случайный предмет из инвентаря.
-    При пустом инвентаре — шанс гибели (3 из 10).
+    При пустом инвентаре — шанс гибели (3 из 10). Случайные значения
+    даёт генератор сессии (game_state.rng, см. rng.py).
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
     """
-    print("\nЛовушка активирована! Пол стал дрожать...")
+    say("\nЛовушка активирована! Пол стал дрожать...")
     
-    current_room = game_state["current_room"]
-    if current_room == "trap_room" and "torch" not in game_state["player_inventory"]:
-        print("Вы попали в ловушку в полной темноте! Невозможно выбраться...")
-        print("Вы проиграли!")  
-        game_state["game_over"] = True
+    current_room = game_state.current_room
+    if current_room == "trap_room" and "torch" not in game_state.player_inventory:
+        say("Вы попали в ловушку в полной темноте! Невозможно выбраться...")
+        say("Вы проиграли!")  
+        record_event(game_state, "trap", lost_item=None)
+        finish_game(game_state, "loss", "dark_trap")
         return
     
-    if game_state["player_inventory"]:
-        inv_len = len(game_state["player_inventory"])
-        idx = pseudo_random(game_state["steps_taken"], inv_len)
-        lost_item = game_state["player_inventory"].pop(idx)
-        print(f"Вы потеряли предмет: {lost_item}")
+    inventory = game_state.player_inventory
+    if inventory:
+        # Ловушка выбирает слот, а из стопки забирает одну штуку
+        idx = game_state.rng.randint(
+            game_state.steps_taken, inventory.slot_count(), LANE_TRAP_ITEM,
+        )
+        lost_item = inventory.pop(idx)
+        say(f"Вы потеряли предмет: {lost_item}")
+        record_event(game_state, "trap", lost_item=lost_item)
     else:
-        damage_roll = pseudo_random(game_state["steps_taken"], EVENT_PROBABILITY)
+        damage_roll = game_state.rng.randint(
+            game_state.steps_taken, EVENT_PROBABILITY, LANE_TRAP_DAMAGE,
+        )
         if damage_roll < TRAP_DAMAGE_THRESHOLD:
-            print("Вас настигла ловушка. Вы проиграли!")
-            game_state["game_over"] = True
+            say("Вас настигла ловушка. Вы проиграли!")
+            record_event(game_state, "trap", lost_item=None)
+            finish_game(game_state, "loss", "trap")
         else:
-            print("Вам удалось уцелеть, но это было близко.")
+            say("Вам удалось уцелеть, но это было близко.")
+            record_event(game_state, "trap", lost_item=None)
 
 
 def random_event(game_state):
@@ -66,165 +79,278 @@ def random_event(game_state):
     в trap_room без факела.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
     """
-    if pseudo_random(game_state["steps_taken"], EVENT_PROBABILITY) != 0:
+    rng = game_state.rng
+    steps = game_state.steps_taken
+    if rng.randint(steps, EVENT_PROBABILITY, LANE_EVENT) != 0:
         return
 
-    event_type = pseudo_random(game_state["steps_taken"], EVENT_TYPES)
-    current_room = game_state["current_room"]
-    room = ROOMS[current_room]
+    event_type = rng.randint(steps, EVENT_TYPES, LANE_EVENT_TYPE)
+    current_room = game_state.current_room
+    record_event(game_state, "random_event", event_type=event_type)
 
     if event_type == 0:
-        print("\nВы заметили что-то блестящее на полу.")
-        if "coin" not in room["items"]:
-            room["items"].append("coin")
-        print("Подняв монетку, вы положили её в карман.")
+        say("\nВы заметили что-то блестящее на полу.")
+        if "coin" not in get_room(game_state, current_room)["items"]:
+            get_mutable_room(game_state, current_room)["items"].append("coin")
+            invalidate_room_view(game_state, current_room)
+        say("Подняв монетку, вы положили её в карман.")
 
     elif event_type == 1:
-        print("\nИз темноты послышался шорох...")
-        if "sword" in game_state["player_inventory"]:
-            print("Вы достали меч, и шорох прекратился. Существо отступило.")
+        say("\nИз темноты послышался шорох...")
+        if "sword" in game_state.player_inventory:
+            say("Вы достали меч, и шорох прекратился. Существо отступило.")
         else:
-            print("Вы затаили дыхание, пока шорох не затих.")
+            say("Вы затаили дыхание, пока шорох не затих.")
 
     elif event_type == 2:
-        has_torch = "torch" in game_state["player_inventory"]
+        has_torch = "torch" in game_state.player_inventory
         if current_room == "trap_room" and not has_torch:
-            print("\nТемнота вокруг сгустилась. Вы наступили на скрытый")
-            print("механизм!")
+            say("\nТемнота вокруг сгустилась. Вы наступили на скрытый")
+            say("механизм!")
             trigger_trap(game_state)
 
 
-def describe_current_room(game_state):
-    """Выводит полное описание текущей комнаты.
-    
-    Включает название (заглавными), описание, предметы, выходы
-    и упоминание загадки при её наличии.
+def wear_out(game_state, item_name):
+    """Забирает у игрока предмет, срок службы которого истёк.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
+        item_name: Название предмета (см. ITEM_LIFETIMES)
     """
-    room_name = game_state["current_room"]
-    room = ROOMS[room_name]
+    if item_name not in game_state.player_inventory:
+        return
+    game_state.player_inventory.remove(item_name)
+    record_event(game_state, "wear_out", item=item_name)
+    say(f"\nПредмет {item_name} пришёл в негодность.")
+
+
+register_effect("trap", lambda game_state, room: trigger_trap(game_state))
+# Случайные события — повторяющееся событие часов мира (см. scheduler.py)
+register_handler("random_event", random_event)
+register_handler("wear_out", wear_out)
 
-    print(f"\n== {room_name.upper()} ==")
-    print(room["description"])
+
+def _render_room(room_name, room):
+    """Собирает текст описания комнаты."""
+    lines = [f"\n== {room_name.upper()} ==", room["description"]]
 
     if room["items"]:
-        print("\nЗаметные предметы:")
-        for item in room["items"]:
-            print(f"  - {item}")
+        lines.append("\nЗаметные предметы:")
+        lines.extend(f"  - {item}" for item in room["items"])
 
     if room["exits"]:
         exits_str = ", ".join(room["exits"].keys())
-        print(f"\nВыходы: {exits_str}")
+        lines.append(f"\nВыходы: {exits_str}")
 
     if room["puzzle"] is not None:
-        print("\nКажется, здесь есть загадка (используйте команду solve).")
+        lines.append("\nКажется, здесь есть загадка (используйте команду solve).")
 
+    return "\n".join(lines)
 
-def solve_puzzle(game_state):
-    """Обрабатывает попытку решения загадки с ограничением попыток.
+
+def render_room(game_state, room_name):
+    """Возвращает текст описания комнаты из кэша.
     
-    После MAX_PUZZLE_ATTEMPTS неверных ответов — проигрыш.
+    Неизменённые комнаты кэшируются один раз для всех сессий мира
+    (в view_cache мира, если он его предоставляет), изменённые — в
+    состоянии сессии до вызова invalidate_room_view.
+    
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты
+    
+    Returns:
+        Текст описания без завершающего перевода строки
+    """
+    if room_name in game_state.rooms:
+        views = game_state.views
+    else:
+        world = game_state.world
+        views = getattr(world, "view_cache", None)
+        if views is None:
+            entry = _base_views.get(id(world))
+            if entry is None or entry[0] is not world:
+                entry = _base_views[id(world)] = (world, {})
+            views = entry[1]
+
+    view = views.get(room_name)
+    if view is None:
+        view = _render_room(room_name, get_room(game_state, room_name))
+        views[room_name] = view
+    return view
+
+
+def invalidate_room_view(game_state, room_name):
+    """Сбрасывает кэш описания комнаты после изменения предметов или загадки.
+    
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название изменённой комнаты
+    """
+    game_state.views.pop(room_name, None)
+
+
+def describe_current_room(game_state):
+    """Выводит полное описание текущей комнаты.
+    
+    Включает название (заглавными), описание, предметы, выходы
+    и упоминание загадки при её наличии.
+    
+    Args:
+        game_state: Состояние игры (GameState)
+    """
+    say(render_room(game_state, game_state.current_room))
+
+
+def run_prompts(steps, ask=input):
+    """Выполняет пошаговую команду, отвечая на её запросы ввода.
+    
+    Пошаговая команда — генератор, который выдаёт текст приглашения
+    и получает ответ игрока через send(). Так одна и та же логика
+    работает и с input(), и с неблокирующим сетевым вводом.
     
     Args:
-        game_state: Словарь с состоянием игры
+        steps: Генератор пошаговой команды
+        ask: Функция, получающая ответ по тексту приглашения
     """
-    room_name = game_state["current_room"]
-    room = ROOMS[room_name]
+    try:
+        prompt = next(steps)
+        while True:
+            flush_output()
+            prompt = steps.send(ask(prompt))
+    except StopIteration:
+        pass
+
+
+def solve_puzzle_steps(game_state):
+    """Пошаговая версия solve_puzzle (см. run_prompts).
     
-    if room["puzzle"] is None:
-        print("Загадок здесь нет.")
+    Args:
+        game_state: Состояние игры (GameState)
+    
+    Yields:
+        Приглашение для ввода ответа на загадку
+    """
+    room_name = game_state.current_room
+
+    if get_room(game_state, room_name)["puzzle"] is None:
+        say("Загадок здесь нет.")
         return
+
+    room = get_mutable_room(game_state, room_name)
     
     if "puzzle_attempts" not in room:
         room["puzzle_attempts"] = 0
     
-    question, correct_answer = room["puzzle"]
-    print(f"\n{question}")
-    user_answer = input("Ваш ответ: ").strip().lower()
+    puzzle = get_puzzle(room_name, room)
+    say(f"\n{puzzle.question}")
+    user_answer = yield "Ваш ответ: "
     
-    correct_variants = [correct_answer.lower()]
-    if correct_answer == "10":
-        correct_variants.append("десять")
-    elif correct_answer == "шаг шаг шаг":
-        correct_variants.append("шагшагшаг")
-    
-    if user_answer in correct_variants:
-        print("Верно! Загадка решена.")
+    if puzzle.matches(user_answer):
+        say("Верно! Загадка решена.")
+        record_event(game_state, "puzzle_solved", room=room_name)
         room["puzzle"] = None
         room["puzzle_attempts"] = 0
-        
-        if room_name == "hall":
-            print("Сундук открылся! Внутри лежит ключ от сокровищницы.")
-            if "treasure_key" not in room["items"]:
-                room["items"].append("treasure_key")
-        elif room_name == "library":
-            print("Свиток раскрылся! Внутри указание на расположение ключа.")
-        elif room_name == "trap_room":
-            print("Плиты замерли. Проход безопасен.")
+        run_effects(game_state, room, puzzle.on_success)
+        invalidate_room_view(game_state, room_name)
     else:
         room["puzzle_attempts"] += 1
-        print(f"Неверно. Попытка {room['puzzle_attempts']} из {MAX_PUZZLE_ATTEMPTS}.")
-        
-        if room_name == "trap_room":
-            trigger_trap(game_state)
+        say(f"Неверно. Попытка {room['puzzle_attempts']} из {MAX_PUZZLE_ATTEMPTS}.")
+        record_event(
+            game_state, "puzzle_failed",
+            room=room_name, attempts=room["puzzle_attempts"],
+        )
+        run_effects(game_state, room, puzzle.on_failure)
         
         if room["puzzle_attempts"] >= MAX_PUZZLE_ATTEMPTS:
-            print("Вы исчерпали все попытки. Загадка осталась нерешённой...")
-            print("Вы проиграли!")
-            game_state["game_over"] = True
+            say("Вы исчерпали все попытки. Загадка осталась нерешённой...")
+            say("Вы проиграли!")
+            finish_game(game_state, "loss", "puzzle_attempts")
 
 
-def attempt_open_treasure(game_state):
-    """Пытается открыть сундук с сокровищем через ключ или код.
+def solve_puzzle(game_state):
+    """Обрабатывает попытку решения загадки с ограничением попыток.
     
-    При наличии treasure_key — мгновенное открытие.
-    Без ключа — предложение ввести код из загадки комнаты.
-    Успешное открытие завершает игру победой.
+    После MAX_PUZZLE_ATTEMPTS неверных ответов — проигрыш.
     
     Args:
-        game_state: Словарь с состоянием игры
+        game_state: Состояние игры (GameState)
     """
-    room_name = game_state["current_room"]
-    room = ROOMS[room_name]
+    run_prompts(solve_puzzle_steps(game_state))
+
+
+def attempt_open_treasure_steps(game_state):
+    """Пошаговая версия attempt_open_treasure (см. run_prompts).
+    
+    Args:
+        game_state: Состояние игры (GameState)
+    
+    Yields:
+        Приглашения для выбора и для ввода кода
+    """
+    room_name = game_state.current_room
+    room = get_room(game_state, room_name)
 
     if "treasure_chest" not in room["items"]:
-        print("Сундук уже открыт.")
+        say("Сундук уже открыт.")
         return
 
-    if "treasure_key" in game_state["player_inventory"]:
-        print("Вы применяете ключ, и замок щёлкает. Сундук открыт!")
-        room["items"].remove("treasure_chest")
-        print("\nВ сундуке сокровище! Вы победили!")
-        game_state["game_over"] = True
+    if "treasure_key" in game_state.player_inventory:
+        say("Вы применяете ключ, и замок щёлкает. Сундук открыт!")
+        get_mutable_room(game_state, room_name)["items"].remove("treasure_chest")
+        invalidate_room_view(game_state, room_name)
+        say("\nВ сундуке сокровище! Вы победили!")
+        finish_game(game_state, "win", "treasure_key")
         return
 
-    print("Сундук заперт. Возможно, можно открыть его кодом. Ввести код?")
-    print("(да/нет)")
-    choice = input("> ").strip().lower()
+    say("Сундук заперт. Возможно, можно открыть его кодом. Ввести код?")
+    say("(да/нет)")
+    choice = (yield "> ").strip().lower()
 
     if choice == "да":
         if room["puzzle"] is None:
-            print("Код уже был использован ранее.")
+            say("Код уже был использован ранее.")
             return
 
-        question, correct_answer = room["puzzle"]
-        print(f"\n{question}")
-        user_answer = input("Ваш ответ: ").strip()
+        puzzle = get_puzzle(room_name, room)
+        say(f"\n{puzzle.question}")
+        user_answer = yield "Ваш ответ: "
 
-        if user_answer.lower() == correct_answer.lower():
-            print("Код верный! Сундук открывается с лёгким щелчком.")
+        if puzzle.matches(user_answer):
+            say("Код верный! Сундук открывается с лёгким щелчком.")
+            room = get_mutable_room(game_state, room_name)
             room["items"].remove("treasure_chest")
             room["puzzle"] = None
-            print("\nВ сундуке сокровище! Вы победили!")
-            game_state["game_over"] = True
+            invalidate_room_view(game_state, room_name)
+            say("\nВ сундуке сокровище! Вы победили!")
+            finish_game(game_state, "win", "code")
         else:
-            print("Неверный код. Сундук остаётся запертым.")
+            say("Неверный код. Сундук остаётся запертым.")
     else:
-        print("Вы отступаете от сундука.")
+        say("Вы отступаете от сундука.")
+
+
+def attempt_open_treasure(game_state):
+    """Пытается открыть сундук с сокровищем через ключ или код.
+    
+    При наличии treasure_key — мгновенное открытие.
+    Без ключа — предложение ввести код из загадки комнаты.
+    Успешное открытие завершает игру победой.
+    
+    Args:
+        game_state: Состояние игры (GameState)
+    """
+    run_prompts(attempt_open_treasure_steps(game_state))
+
+
+@functools.cache
+def _help_text():
+    """Собирает текст справки один раз за процесс."""
+    lines = ["\nДоступные команды:"]
+    lines.extend(f"  {cmd:<16} - {desc}" for cmd, desc in COMMANDS.items())
+    return "\n".join(lines)
 
 
 def show_help():
@@ -233,6 +359,4 @@ def show_help():
     Использует константу COMMANDS из constants.py с выравниванием
     команд по левому краю (ширина 16 символов).
     """
-    print("\nДоступные команды:")
-    for cmd, desc in COMMANDS.items():
-        print(f"  {cmd:<16} - {desc}")
\ No newline at end of file
+    say(_help_text())
@@ -0,0 +1,220 @@
+from labyrinth_game.constants import ROOMS
+from labyrinth_game.inventory import Inventory
+from labyrinth_game.rng import SIN_RNG
+from labyrinth_game.scheduler import Scheduler
+
+
+class GameState:
+    """Состояние одной игровой сессии.
+
+    Атрибуты объявлены в __slots__: у объекта нет собственного словаря,
+    поэтому живая сессия занимает немного памяти, а доступ к полям не
+    требует поиска по строковым ключам.
+
+    Attributes:
+        player_inventory: Предметы игрока (Inventory)
+        current_room: Название текущей комнаты
+        game_over: Закончена ли игра
+        steps_taken: Число сделанных шагов
+        world: Словарь комнат, общий для всех сессий
+        rooms: Слой комнат, изменённых в этой сессии (см. get_mutable_room)
+        outcome: Исход игры ("win", "loss", "quit") или None
+        cause: Причина исхода или None
+        events: Список событий сессии или None, если события не собираются
+        views: Кэш текстов изменённых комнат сессии (см. utils.render_room)
+        rng: Генератор случайных событий сессии (см. rng.py)
+        timers: Планировщик событий по шагам (см. scheduler.py) или None,
+            если у сессии нет часов мира
+    """
+
+    __slots__ = (
+        "player_inventory",
+        "current_room",
+        "game_over",
+        "steps_taken",
+        "world",
+        "rooms",
+        "outcome",
+        "cause",
+        "events",
+        "views",
+        "rng",
+        "timers",
+    )
+
+    def __init__(self, world=ROOMS, rng=SIN_RNG):
+        self.player_inventory = Inventory()
+        self.current_room = "entrance"
+        self.game_over = False
+        self.steps_taken = 0
+        self.world = world
+        self.rooms = {}
+        self.outcome = None
+        self.cause = None
+        self.events = None
+        self.views = {}
+        self.rng = rng
+        self.timers = None
+
+    def __getstate__(self):
+        # Общие данные ROOMS есть в каждом процессе, передавать их не нужно
+        state = {name: getattr(self, name) for name in self.__slots__}
+        if self.world is ROOMS:
+            del state["world"]
+        return state
+
+    def __setstate__(self, state):
+        self.world = ROOMS
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return (
+            f"GameState(current_room={self.current_room!r}, "
+            f"steps_taken={self.steps_taken}, "
+            f"player_inventory={self.player_inventory!r}, "
+            f"game_over={self.game_over})"
+        )
+
+
+def create_game_state(world=ROOMS, rng=SIN_RNG, timers=False):
+    """Создаёт состояние новой игровой сессии.
+
+    Комнаты не копируются: сессия хранит только слой своих изменений
+    поверх общих статичных данных world (см. get_mutable_room).
+
+    Args:
+        world: Словарь комнат, общий для всех сессий (по умолчанию ROOMS)
+        rng: Генератор случайных событий (по умолчанию прежняя
+            последовательность на основе синуса)
+        timers: Завести ли часы мира: случайные события тогда становятся
+            повторяющимся событием планировщика, и можно планировать свои
+
+    Returns:
+        Состояние игры (GameState)
+    """
+    game_state = GameState(world, rng)
+    if timers:
+        game_state.timers = Scheduler()
+        game_state.timers.schedule(1, "random_event", period=1)
+    return game_state
+
+
+def copy_state(game_state):
+    """Создаёт независимую копию состояния игры.
+
+    Копируются только инвентарь, слой изменённых комнат и часы сессии,
+    общие данные world остаются общими.
+
+    Args:
+        game_state: Состояние игры (GameState)
+
+    Returns:
+        Новое состояние игры (GameState)
+    """
+    new_state = GameState(game_state.world, game_state.rng)
+    new_state.player_inventory = game_state.player_inventory.copy()
+    new_state.current_room = game_state.current_room
+    new_state.game_over = game_state.game_over
+    new_state.steps_taken = game_state.steps_taken
+    new_state.rooms = {
+        name: dict(room, items=list(room["items"]))
+        for name, room in game_state.rooms.items()
+    }
+    new_state.outcome = game_state.outcome
+    new_state.cause = game_state.cause
+    if game_state.events is not None:
+        new_state.events = list(game_state.events)
+    new_state.views = dict(game_state.views)
+    if game_state.timers is not None:
+        new_state.timers = game_state.timers.copy()
+    return new_state
+
+
+def record_event(game_state, kind, **details):
+    """Записывает игровое событие, если сессия собирает события.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        kind: Тип события (move, take, trap, win, ...)
+        **details: Подробности события
+    """
+    events = game_state.events
+    if events is not None:
+        events.append((kind, details))
+
+
+def schedule(game_state, delay, name, *args, period=0):
+    """Планирует событие сессии, если у неё есть часы мира.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        delay: Через сколько шагов сработать
+        name: Название обработчика (см. scheduler.register_handler)
+        *args: Строковые аргументы обработчика
+        period: Период повторения в шагах или 0
+
+    Returns:
+        Таймер (scheduler.Timer) или None, если часов нет
+    """
+    timers = game_state.timers
+    if timers is None:
+        return None
+    return timers.schedule(delay, name, *args, period=period)
+
+
+def finish_game(game_state, outcome, cause):
+    """Завершает игру и запоминает её исход.
+
+    Повторный вызов в рамках той же команды не меняет первый исход.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        outcome: Исход игры: "win", "loss" или "quit"
+        cause: Причина исхода (например, "trap" или "puzzle_attempts")
+    """
+    if game_state.game_over:
+        return
+    game_state.game_over = True
+    game_state.outcome = outcome
+    game_state.cause = cause
+    record_event(game_state, outcome, cause=cause)
+
+
+def get_room(game_state, room_name):
+    """Возвращает комнату для чтения с учётом изменений сессии.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты
+
+    Returns:
+        Словарь комнаты (его нельзя изменять напрямую)
+    """
+    room = game_state.rooms.get(room_name)
+    if room is None:
+        room = game_state.world[room_name]
+    return room
+
+
+def get_mutable_room(game_state, room_name):
+    """Возвращает собственную копию комнаты сессии для изменения.
+
+    При первом обращении комната копируется из общих данных: копия
+    поверхностная, отдельный список получают только предметы, а описание,
+    выходы и загадка остаются общими неизменяемыми объектами.
+
+    Args:
+        game_state: Состояние игры (GameState)
+        room_name: Название комнаты
+
+    Returns:
+        Словарь комнаты, принадлежащий только этой сессии
+    """
+    rooms = game_state.rooms
+    room = rooms.get(room_name)
+    if room is None:
+        room = dict(game_state.world[room_name])
+        room["items"] = list(room["items"])
+        rooms[room_name] = room
+    return room
@@ -0,0 +1,583 @@
+import gc
+import hashlib
+import json
+import marshal
+import mmap
+import random
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from labyrinth_game.fileio import write_atomic
+
+MAGIC = b"LBWD"
+# Версия 2 добавила эффекты загадок комнаты (ключ puzzle_effects)
+VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+_HEADER = struct.Struct("<4sHIQQI")  # сигнатура, версия, комнат, индекс, хэш, слотов
+_ENTRY = struct.Struct("<QI")         # смещение и длина записи комнаты
+_SLOT = struct.Struct("<I")           # номер комнаты + 1 (0 — пустой слот)
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+IMAGE_MAGIC = b"LBIM"
+IMAGE_VERSION = 1
+IMAGE_SUFFIX = ".img"
+
+_IMAGE_HEADER = struct.Struct("<4sH16s")  # сигнатура, версия, хэш исходника
+
+OPPOSITE = {"north": "south", "south": "north", "east": "west", "west": "east"}
+DEFAULT_CACHE_SIZE = 4096
+
+
+class LRUCache(OrderedDict):
+    """Словарь ограниченного размера, вытесняющий давно не читанные ключи."""
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+def _put_str(out, text, size=_U16):
+    data = text.encode("utf-8")
+    out += size.pack(len(data))
+    out += data
+
+
+def _get_str(buffer, offset, size=_U16):
+    (length,) = size.unpack_from(buffer, offset)
+    offset += size.size
+    return str(buffer[offset:offset + length], "utf-8"), offset + length
+
+
+def encode_room(name, room):
+    """Кодирует комнату в запись файла мира.
+
+    Название идёт первым полем, чтобы поиск по хэш-таблице мог сравнить
+    его, не разбирая остальную запись.
+
+    Args:
+        name: Название комнаты
+        room: Словарь комнаты в формате ROOMS
+
+    Returns:
+        Байты записи
+    """
+    out = bytearray()
+    _put_str(out, name)
+    _put_str(out, room["description"], _U32)
+
+    out += _U16.pack(len(room["exits"]))
+    for direction, target in room["exits"].items():
+        _put_str(out, direction)
+        _put_str(out, target)
+
+    out += _U16.pack(len(room["items"]))
+    for item in room["items"]:
+        _put_str(out, item)
+
+    if room["puzzle"] is None:
+        out += b"\x00"
+    else:
+        question, answer = room["puzzle"]
+        out += b"\x01"
+        _put_str(out, question, _U32)
+        _put_str(out, answer)
+
+    effects = room.get("puzzle_effects")
+    if effects is None:
+        out += b"\x00"
+    else:
+        out += b"\x01"
+        _put_str(out, json.dumps(effects, ensure_ascii=False), _U32)
+    return bytes(out)
+
+
+def decode_room(buffer, offset=0, version=VERSION):
+    """Разбирает запись комнаты.
+
+    Args:
+        buffer: Байты или отображение файла в память
+        offset: Смещение начала записи
+        version: Версия формата файла, из которого взята запись
+
+    Returns:
+        Пара (название, словарь комнаты в формате ROOMS)
+    """
+    name, offset = _get_str(buffer, offset)
+    description, offset = _get_str(buffer, offset, _U32)
+
+    (count,) = _U16.unpack_from(buffer, offset)
+    offset += _U16.size
+    exits = {}
+    for _ in range(count):
+        direction, offset = _get_str(buffer, offset)
+        exits[direction], offset = _get_str(buffer, offset)
+
+    (count,) = _U16.unpack_from(buffer, offset)
+    offset += _U16.size
+    items = []
+    for _ in range(count):
+        item, offset = _get_str(buffer, offset)
+        items.append(item)
+
+    puzzle = None
+    if buffer[offset]:
+        question, offset = _get_str(buffer, offset + 1, _U32)
+        answer, offset = _get_str(buffer, offset)
+        puzzle = (question, answer)
+    else:
+        offset += 1
+
+    room = {
+        "description": description,
+        "exits": exits,
+        "items": items,
+        "puzzle": puzzle,
+    }
+    if version >= 2 and buffer[offset]:
+        effects, offset = _get_str(buffer, offset + 1, _U32)
+        room["puzzle_effects"] = json.loads(effects)
+    return name, room
+
+
+def _name_hash(name_bytes):
+    return zlib.crc32(name_bytes)
+
+
+def write_world(path, rooms, room_count):
+    """Записывает мир в индексированный файл, не держа его в памяти.
+
+    Формат: заголовок, записи комнат подряд, таблица (смещение, длина)
+    по номерам комнат и хэш-таблица с открытой адресацией для поиска
+    номера по названию.
+
+    Args:
+        path: Путь к файлу мира
+        rooms: Итерируемый объект пар (название, словарь комнаты)
+        room_count: Число комнат в rooms
+    """
+    slots_count = 1
+    while slots_count < room_count * 2:
+        slots_count *= 2
+    mask = slots_count - 1
+
+    offsets = array("Q")
+    lengths = array("I")
+    slots = array("I", [0]) * slots_count
+
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, 0, 0, 0, 0))
+        for room_id, (name, room) in enumerate(rooms):
+            record = encode_room(name, room)
+            offsets.append(file.tell())
+            lengths.append(len(record))
+            file.write(record)
+
+            slot = _name_hash(name.encode("utf-8")) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = room_id + 1
+
+        if len(offsets) != room_count:
+            raise ValueError(
+                f"Ожидалось комнат: {room_count}, записано: {len(offsets)}"
+            )
+
+        index_offset = file.tell()
+        for offset, length in zip(offsets, lengths):
+            file.write(_ENTRY.pack(offset, length))
+        hash_offset = file.tell()
+        file.write(slots.tobytes())
+
+        file.seek(0)
+        file.write(_HEADER.pack(
+            MAGIC, VERSION, room_count, index_offset, hash_offset, slots_count,
+        ))
+
+
+class LazyWorld(Mapping):
+    """Мир из файла, комнаты которого разбираются при первом обращении.
+
+    Файл отображается в память целиком, но в Python-объекты превращаются
+    только запрошенные комнаты. Разобранные комнаты и их тексты описаний
+    хранятся в ограниченных LRU-кэшах.
+
+    Attributes:
+        path: Путь к файлу мира
+        rooms_cache: Кэш разобранных комнат
+        view_cache: Кэш текстов описаний неизменённых комнат
+            (см. utils.render_room)
+    """
+
+    def __init__(self, path, cache_size=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self._file = open(path, "rb")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._count, self._index_offset,
+         self._hash_offset, slots_count) = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            self.close()
+            raise ValueError(f"{path} не является файлом мира этой версии")
+        self._version = version
+        self._mask = slots_count - 1
+        self.rooms_cache = LRUCache(cache_size)
+        self.view_cache = LRUCache(cache_size)
+
+    def _record_offset(self, room_id):
+        offset, _ = _ENTRY.unpack_from(
+            self._buffer, self._index_offset + room_id * _ENTRY.size,
+        )
+        return offset
+
+    def room_id(self, name):
+        """Возвращает номер комнаты по названию или None."""
+        name_bytes = name.encode("utf-8")
+        slot = _name_hash(name_bytes) & self._mask
+        while True:
+            (value,) = _SLOT.unpack_from(self._buffer, self._hash_offset + slot * 4)
+            if not value:
+                return None
+            offset = self._record_offset(value - 1)
+            (length,) = _U16.unpack_from(self._buffer, offset)
+            start = offset + _U16.size
+            if self._buffer[start:start + length] == name_bytes:
+                return value - 1
+            slot = (slot + 1) & self._mask
+
+    def room_by_id(self, room_id):
+        """Разбирает комнату по номеру (без кэширования).
+
+        Returns:
+            Пара (название, словарь комнаты)
+        """
+        return decode_room(
+            self._buffer, self._record_offset(room_id), self._version,
+        )
+
+    def exit_table(self, directions=()):
+        """Строит плоскую таблицу смежности, не разбирая комнаты.
+
+        Из записей читаются только названия и выходы; кэши комнат не
+        затрагиваются. Формат таблицы тот же, что у graph.WorldGraph.exits.
+
+        Args:
+            directions: Направления, которые получат первые номера
+
+        Returns:
+            Пара (кортеж направлений, array('i') выходов: номер комнаты
+            или -1)
+
+        Raises:
+            ValueError: Если выход ведёт в несуществующую комнату
+        """
+        buffer = self._buffer
+        unpack_u16 = _U16.unpack_from
+        unpack_u32 = _U32.unpack_from
+        room_ids = {}
+        directions = list(directions)
+        direction_ids = {
+            direction.encode("utf-8"): index
+            for index, direction in enumerate(directions)
+        }
+        edges = []
+        for room_id in range(self._count):
+            offset = self._record_offset(room_id)
+            (length,) = unpack_u16(buffer, offset)
+            offset += _U16.size
+            room_ids[buffer[offset:offset + length]] = room_id
+            offset += length
+            (length,) = unpack_u32(buffer, offset)
+            offset += _U32.size + length
+
+            (count,) = unpack_u16(buffer, offset)
+            offset += _U16.size
+            for _ in range(count):
+                (length,) = unpack_u16(buffer, offset)
+                offset += _U16.size
+                direction = buffer[offset:offset + length]
+                offset += length
+                direction_id = direction_ids.get(direction)
+                if direction_id is None:
+                    direction_id = direction_ids[direction] = len(directions)
+                    directions.append(str(direction, "utf-8"))
+                (length,) = unpack_u16(buffer, offset)
+                offset += _U16.size
+                edges.append((room_id, direction_id, buffer[offset:offset + length]))
+                offset += length
+
+        width = len(directions)
+        exits = array("i", [-1]) * (self._count * width)
+        for room_id, direction_id, target in edges:
+            target_id = room_ids.get(target)
+            if target_id is None:
+                raise ValueError(
+                    f"Выход {directions[direction_id]!r} из комнаты "
+                    f"№{room_id} ведёт в неизвестную комнату "
+                    f"{str(target, 'utf-8')!r}"
+                )
+            exits[room_id * width + direction_id] = target_id
+        return tuple(directions), exits
+
+    def __getitem__(self, name):
+        room = self.rooms_cache.get(name)
+        if room is None:
+            room_id = self.room_id(name)
+            if room_id is None:
+                raise KeyError(name)
+            _, room = self.room_by_id(room_id)
+            self.rooms_cache[name] = room
+        return room
+
+    def __contains__(self, name):
+        return name in self.rooms_cache or self.room_id(name) is not None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for room_id in range(self._count):
+            offset = self._record_offset(room_id)
+            yield _get_str(self._buffer, offset)[0]
+
+    def close(self):
+        """Закрывает отображение и файл мира."""
+        self._buffer.close()
+        self._file.close()
+
+
+def _source_digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def parse_world_json(data):
+    """Разбирает мир из JSON-исходника в формат ROOMS.
+
+    Args:
+        data: Байты JSON-объекта {название: комната}
+
+    Returns:
+        Словарь комнат; загадки приводятся к кортежам (вопрос, ответ)
+    """
+    rooms = json.loads(data)
+    for room in rooms.values():
+        room.setdefault("items", [])
+        puzzle = room.get("puzzle")
+        room["puzzle"] = tuple(puzzle) if puzzle is not None else None
+    return rooms
+
+
+def _read_image(path, digest):
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) < _IMAGE_HEADER.size:
+        return None
+    magic, version, image_digest = _IMAGE_HEADER.unpack_from(data, 0)
+    if magic != IMAGE_MAGIC or version != IMAGE_VERSION or image_digest != digest:
+        return None
+    # Сборщик мусора не нужен, пока создаются заведомо живые объекты мира
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return marshal.loads(memoryview(data)[_IMAGE_HEADER.size:])
+    except (EOFError, ValueError, TypeError):
+        return None
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _write_image(path, digest, rooms):
+    data = _IMAGE_HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, digest) + marshal.dumps(rooms)
+    try:
+        write_atomic(path, data)
+    except OSError:
+        # Образ — только ускорение: без права записи мир читается из JSON
+        pass
+
+
+def load_world_image(path):
+    """Загружает мир из JSON-исходника через кэшированный образ.
+
+    Рядом с исходником хранится образ path.img: разобранный словарь
+    комнат в формате marshal с хэшем исходника в заголовке. Если хэш
+    совпадает, JSON не разбирается; иначе образ пересобирается.
+
+    Args:
+        path: Путь к JSON-файлу мира
+
+    Returns:
+        Словарь комнат в формате ROOMS
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    digest = _source_digest(data)
+    image_path = path + IMAGE_SUFFIX
+
+    rooms = _read_image(image_path, digest)
+    if rooms is None:
+        rooms = parse_world_json(data)
+        _write_image(image_path, digest, rooms)
+    return rooms
+
+
+def load_world(path):
+    """Открывает мир из файла подходящим способом.
+
+    JSON-исходники загружаются целиком через кэшированный образ
+    (см. load_world_image), двоичные файлы миров — лениво (LazyWorld).
+
+    Args:
+        path: Путь к файлу мира (.json или файл write_world)
+
+    Returns:
+        Словарь комнат или LazyWorld
+    """
+    if path.endswith(".json"):
+        return load_world_image(path)
+    return LazyWorld(path)
+
+
+def generate_rooms(room_count, seed=0, loop_ratio=0.1):
+    """Порождает лабиринт на сетке: остовное дерево и немного петель.
+
+    Первая комната называется entrance (в ней факел), последняя —
+    treasure_room (сундук с кодовым замком), в случайной комнате лежит
+    rusty_key.
+
+    Args:
+        room_count: Число комнат (не меньше 2)
+        seed: Зерно генератора
+        loop_ratio: Доля дополнительных проходов, образующих петли
+
+    Yields:
+        Пары (название, словарь комнаты)
+    """
+    rng = random.Random(seed)
+    width = max(1, int(room_count ** 0.5))
+
+    def name_of(room_id):
+        if room_id == 0:
+            return "entrance"
+        if room_id == room_count - 1:
+            return "treasure_room"
+        return f"room_{room_id}"
+
+    def neighbour(room_id, direction):
+        row, column = divmod(room_id, width)
+        if direction == "north":
+            target = room_id - width if row > 0 else -1
+        elif direction == "south":
+            target = room_id + width
+        elif direction == "west":
+            target = room_id - 1 if column > 0 else -1
+        else:
+            target = room_id + 1 if column < width - 1 else -1
+        return target if 0 <= target < room_count else -1
+
+    # Остовное дерево случайным обходом в глубину: лабиринт связный
+    exits = [dict() for _ in range(room_count)]
+    visited = bytearray(room_count)
+    visited[0] = 1
+    stack = [0]
+    while stack:
+        room_id = stack[-1]
+        options = [
+            (direction, target)
+            for direction in OPPOSITE
+            if (target := neighbour(room_id, direction)) >= 0 and not visited[target]
+        ]
+        if not options:
+            stack.pop()
+            continue
+        direction, target = rng.choice(options)
+        exits[room_id][direction] = target
+        exits[target][OPPOSITE[direction]] = room_id
+        visited[target] = 1
+        stack.append(target)
+
+    for _ in range(int(room_count * loop_ratio)):
+        room_id = rng.randrange(room_count)
+        direction = rng.choice(tuple(OPPOSITE))
+        target = neighbour(room_id, direction)
+        if target >= 0:
+            exits[room_id][direction] = target
+            exits[target][OPPOSITE[direction]] = room_id
+
+    key_room = rng.randrange(1, room_count - 1) if room_count > 2 else 0
+    for room_id in range(room_count):
+        items = []
+        puzzle = None
+        if room_id == 0:
+            items.append("torch")
+        if room_id == key_room:
+            items.append("rusty_key")
+        if room_id == room_count - 1:
+            items.append("treasure_chest")
+            puzzle = ("Дверь защищена кодом. Введите код (подсказка: 2*5= ? )", "10")
+
+        yield name_of(room_id), {
+            "description": f"Каменный коридор лабиринта, секция {room_id}.",
+            "exits": {
+                direction: name_of(target)
+                for direction, target in exits[room_id].items()
+            },
+            "items": items,
+            "puzzle": puzzle,
+        }
+        exits[room_id] = None
+
+
+def generate_world(path, room_count, seed=0):
+    """Генерирует лабиринт и записывает его в файл мира.
+
+    Args:
+        path: Путь к файлу мира
+        room_count: Число комнат
+        seed: Зерно генератора
+    """
+    write_world(path, generate_rooms(room_count, seed), room_count)
+
+
+def main():
+    """Точка входа: генерирует файл мира заданного размера.
+
+    Для путей с расширением .json записывается JSON-исходник.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Генератор миров Лабиринта")
+    parser.add_argument("path", help="файл мира (.json — исходник в JSON)")
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.path.endswith(".json"):
+        with open(args.path, "w", encoding="utf-8") as file:
+            json.dump(dict(generate_rooms(args.rooms, args.seed)), file,
+                      ensure_ascii=False)
+    else:
+        generate_world(args.path, args.rooms, args.seed)
+    print(f"Записан мир из {args.rooms} комнат: {args.path}")
+
+
+if __name__ == "__main__":
+    main()